@@ -4,6 +4,7 @@ Django settings for fuel_optimization project.
 
 from pathlib import Path
 import os
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -125,18 +126,46 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'fuel_route.renderers.ORJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True
+# Let the frontend read route ETags and send them back for conditional requests
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match', 'if-modified-since')
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # Routing API settings (can be overridden with environment variables)
 ROUTING_API_PROVIDER = os.getenv('ROUTING_API_PROVIDER', 'openrouteservice')  # openrouteservice, mapbox, osrm
 ROUTING_API_KEY = os.getenv('ROUTING_API_KEY', '')  # Set your API key here
 
+# Cache settings (geocoding and routing results). Set REDIS_URL to share the cache between workers
+# (requires the redis package); otherwise each process keeps its own in-memory cache
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fuel-optimization',
+        }
+    }
+GEOCODE_CACHE_TIMEOUT = 60 * 60 * 24 * 30  # 30 days; forward geocodes rarely change
+ROUTE_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7 days; routing API results for the same endpoints
+# Routes are only written to the Django cache when it is shared between workers; an in-memory
+# backend would hold a second copy of what RoutingService's per-process LRU already keeps
+ROUTE_SHARED_CACHE = bool(REDIS_URL)
+ROUTE_RESPONSE_MAX_AGE = 300  # Cache-Control max-age (seconds) on route responses, which carry an ETag
+STATION_VERSION_CACHE_TIMEOUT = 60  # seconds the station table version behind ETag/Last-Modified is cached
+
 # Vehicle settings
 VEHICLE_RANGE_MILES = 500
 VEHICLE_FUEL_EFFICIENCY_MPG = 10
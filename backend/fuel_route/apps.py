@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FuelRouteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fuel_route'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -2,19 +2,75 @@
 Management command to load fuel stations from CSV file.
 This command geocodes addresses and stores them in the database.
 """
+import asyncio
+import collections
 import csv
+import itertools
+import io
+import operator
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from geopy.adapters import AioHTTPAdapter
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
+from geopy.extra.rate_limiter import AsyncRateLimiter
 
-from fuel_route.models import FuelStation
+from fuel_route.models import FuelStation, GeocodeCache
+
+
+def address_key(query):
+    """Normalize a geocoding query for cache lookups"""
+    return re.sub(r'\s+', ' ', query.lower()).strip()
+
+
+def _parse_csv_chunk(csv_file, start, end):
+    """Parse the rows in the byte range [start, end) of a CSV file"""
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return list(csv.reader(io.StringIO(text)))
+
+
+def _copy_value(value):
+    """Format a value for PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
 
 
 class Command(BaseCommand):
     help = 'Load fuel stations from CSV file and geocode addresses'
+    
+    BATCH_SIZE = 1000
+    PROGRESS_EVERY = 1000
+    # Files at least this large are parsed in parallel chunks
+    PARALLEL_PARSE_MIN_BYTES = 64 * 1024 * 1024
+    # Geocoded stations are saved every this many results
+    GEOCODE_SAVE_EVERY = 100
+    # Most recent in-flight lookups and misses remembered during a geocoding run
+    GEOCODE_MEMO_SIZE = 100000
+    CSV_COLUMNS = (
+        'OPIS Truckstop ID', 'Truckstop Name', 'Address', 'City',
+        'State', 'Rack ID', 'Retail Price',
+    )
+    # Coordinates are owned by the geocoding phase, so CSV upserts never rewrite them
+    UPDATE_FIELDS = [
+        'truckstop_name', 'address', 'city', 'state',
+        'rack_id', 'retail_price',
+    ]
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -34,141 +90,491 @@ class Command(BaseCommand):
             default=None,
             help='Limit number of records to process (for testing)'
         )
+        parser.add_argument(
+            '--geocode-only',
+            action='store_true',
+            help='Skip CSV loading and only geocode stations that are missing coordinates'
+        )
+        parser.add_argument(
+            '--geocode-concurrency',
+            type=int,
+            default=1,
+            help='Number of geocoding requests in flight at once (default: 1)'
+        )
+        parser.add_argument(
+            '--geocode-delay',
+            type=float,
+            default=1.0,
+            help='Minimum delay in seconds between geocoding requests '
+                 '(default: 1.0, the public Nominatim usage policy)'
+        )
+        parser.add_argument(
+            '--geocoder-url',
+            type=str,
+            default=None,
+            help='Base URL of a self-hosted Nominatim instance, e.g. http://localhost:8080 '
+                 '(default: public nominatim.openstreetmap.org). Pair with a higher '
+                 '--geocode-concurrency and lower --geocode-delay.'
+        )
 
     def handle(self, *args, **options):
         csv_file = options.get('csv_file')
         skip_geocoding = options.get('skip_geocoding', False)
         limit = options.get('limit')
+        geocode_only = options.get('geocode_only', False)
+        geocode_concurrency = max(1, options.get('geocode_concurrency') or 1)
+        geocode_delay = options.get('geocode_delay', 1.0)
+        geocoder_url = options.get('geocoder_url')
         
-        if not csv_file:
-            # Default to data file in app directory
-            csv_file = os.path.join(
-                settings.BASE_DIR,
-                'fuel_route',
-                'data',
-                'fuel-prices.csv'
-            )
+        processed = created = updated = errors = geocoded = 0
         
-        if not os.path.exists(csv_file):
-            self.stdout.write(self.style.ERROR(f'CSV file not found: {csv_file}'))
-            return
+        # Phase 1: parse the CSV and upsert stations (fast, DB-bound)
+        if not geocode_only:
+            if not csv_file:
+                # Default to data file in app directory
+                csv_file = os.path.join(
+                    settings.BASE_DIR,
+                    'fuel_route',
+                    'data',
+                    'fuel-prices.csv'
+                )
+            
+            if not os.path.exists(csv_file):
+                self.stdout.write(self.style.ERROR(f'CSV file not found: {csv_file}'))
+                return
+            
+            counts = self._load_csv(csv_file, limit)
+            if counts is None:
+                return
+            processed, created, updated, errors = counts
         
+        # Phase 2: geocode stations still missing coordinates (slow, network-bound)
+        if not skip_geocoding:
+            geocoded = self._geocode_missing(
+                limit, geocode_concurrency, geocode_delay, geocoder_url
+            )
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'\nCompleted!\n'
+            f'Processed: {processed}\n'
+            f'Created: {created}\n'
+            f'Updated: {updated}\n'
+            f'Geocoded: {geocoded}\n'
+            f'Errors: {errors}'
+        ))
+
+    def _load_csv(self, csv_file, limit):
+        """
+        Parse the CSV and create/update stations in batches.
+        Returns (processed, created, updated, errors), or None if the header is invalid.
+        """
         self.stdout.write(f'Loading fuel stations from: {csv_file}')
         
-        geolocator = Nominatim(user_agent="fuel_optimization_app", timeout=10)
         processed = 0
         created = 0
         updated = 0
-        geocoded = 0
         errors = 0
         
+        # Load existing stations once instead of querying per row
+        stations = FuelStation.objects.only(
+            'id', 'opis_truckstop_id', *self.UPDATE_FIELDS
+        ).in_bulk(field_name='opis_truckstop_id')
+        to_create = {}
+        to_update = {}
+        # Row errors are reported after the loop so they don't break up the progress line
+        row_errors = []
+        
         with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+            reader = csv.reader(f)
+            try:
+                header = next(reader)
+                # Plain rows + one itemgetter avoid building a dict per CSV row
+                get_fields = operator.itemgetter(
+                    *(header.index(name) for name in self.CSV_COLUMNS)
+                )
+            except (StopIteration, ValueError) as e:
+                self.stdout.write(self.style.ERROR(f'Invalid CSV header: {e}'))
+                return None
+            
+            rows = reader
+            if not limit and os.path.getsize(csv_file) >= self.PARALLEL_PARSE_MIN_BYTES:
+                rows = self._parse_parallel(csv_file)
             
-            for row in reader:
+            for row in rows:
                 if limit and processed >= limit:
                     break
                 
                 try:
-                    opis_id = int(row['OPIS Truckstop ID'])
-                    truckstop_name = row['Truckstop Name'].strip()
-                    address = row['Address'].strip()
-                    city = row['City'].strip()
-                    state = row['State'].strip()
-                    rack_id = int(row['Rack ID'])
-                    retail_price = float(row['Retail Price'])
-                    
-                    # Get or create station
-                    station, created_flag = FuelStation.objects.get_or_create(
-                        opis_truckstop_id=opis_id,
-                        defaults={
-                            'truckstop_name': truckstop_name,
-                            'address': address,
-                            'city': city,
-                            'state': state,
-                            'rack_id': rack_id,
-                            'retail_price': retail_price,
-                        }
-                    )
+                    (opis_id, truckstop_name, address, city,
+                     state, rack_id, retail_price) = get_fields(row)
+                    opis_id = int(opis_id)
+                    truckstop_name = truckstop_name.strip()
+                    address = address.strip()
+                    city = city.strip()
+                    state = state.strip()
+                    rack_id = int(rack_id)
+                    retail_price = float(retail_price)
                     
-                    if created_flag:
+                    station = stations.get(opis_id)
+                    if station is None:
+                        station = FuelStation(
+                            opis_truckstop_id=opis_id,
+                            truckstop_name=truckstop_name,
+                            address=address,
+                            city=city,
+                            state=state,
+                            rack_id=rack_id,
+                            retail_price=retail_price,
+                        )
+                        stations[opis_id] = station
+                        to_create[opis_id] = station
                         created += 1
                     else:
-                        # Update existing station
+                        # Update existing station (or a duplicate row of a pending one)
                         station.truckstop_name = truckstop_name
                         station.address = address
                         station.city = city
                         station.state = state
                         station.rack_id = rack_id
                         station.retail_price = retail_price
+                        if opis_id not in to_create:
+                            to_update[opis_id] = station
                         updated += 1
                     
-                    # Geocode if needed
-                    if not skip_geocoding and (not station.latitude or not station.longitude):
-                        location = None
-                        
-                        # Try multiple address formats
-                        address_formats = [
-                            f"{truckstop_name}, {city}, {state}, USA",  # Try with business name
-                            f"{city}, {state}, USA",  # Fallback to city/state
-                            f"{address}, {city}, {state}, USA",  # Original format
-                        ]
-                        
-                        # If address contains highway/interstate info, try extracting it
-                        if 'I-' in address or 'US-' in address or 'EXIT' in address.upper():
-                            # Try with just city and state (more reliable for highway exits)
-                            address_formats.insert(0, f"{city}, {state}, USA")
-                            # Try with business name and city/state
-                            address_formats.insert(1, f"{truckstop_name}, {city}, {state}, USA")
-                        
-                        for addr_format in address_formats:
-                            try:
-                                location = geolocator.geocode(addr_format, timeout=10)
-                                if location:
-                                    break
-                                time.sleep(0.5)  # Small delay between attempts
-                            except (GeocoderTimedOut, GeocoderServiceError) as e:
-                                self.stdout.write(
-                                    self.style.WARNING(
-                                        f'Geocoding error for {addr_format}: {e}'
-                                    )
-                                )
-                                time.sleep(1)  # Longer delay on error
-                                continue
-                        
-                        if location:
-                            station.latitude = location.latitude
-                            station.longitude = location.longitude
-                            geocoded += 1
-                        else:
-                            self.stdout.write(
-                                self.style.WARNING(
-                                    f'Could not geocode: {truckstop_name}, {city}, {state}'
-                                )
-                            )
-                        
-                        # Rate limiting - be nice to geocoding service
-                        time.sleep(1)
-                    
-                    station.save()
                     processed += 1
                     
-                    if processed % 100 == 0:
-                        self.stdout.write(f'Processed {processed} stations...')
+                    if len(to_create) + len(to_update) >= self.BATCH_SIZE:
+                        self._flush(to_create, to_update)
+                    
+                    if processed % self.PROGRESS_EVERY == 0:
+                        self.stdout.write(f'\rProcessed {processed} stations...', ending='')
+                        self.stdout.flush()
                 
-                except (ValueError, KeyError) as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Error processing row: {e}')
-                    )
+                except (ValueError, IndexError) as e:
+                    row_errors.append(f'Error processing row: {e}')
                     errors += 1
                     continue
         
-        self.stdout.write(self.style.SUCCESS(
-            f'\nCompleted!\n'
-            f'Processed: {processed}\n'
-            f'Created: {created}\n'
-            f'Updated: {updated}\n'
-            f'Geocoded: {geocoded}\n'
-            f'Errors: {errors}'
-        ))
+        self._flush(to_create, to_update)
+        if processed >= self.PROGRESS_EVERY:
+            self.stdout.write('')
+        if row_errors:
+            self.stdout.write(self.style.ERROR('\n'.join(row_errors)))
+        
+        return processed, created, updated, errors
+
+    def _parse_parallel(self, csv_file):
+        """
+        Split the file at newline boundaries and parse the chunks in worker
+        processes, yielding data rows in file order. Assumes quoted fields
+        don't contain newlines, which holds for the OPIS price export.
+        """
+        workers = os.cpu_count() or 1
+        size = os.path.getsize(csv_file)
+        
+        with open(csv_file, 'rb') as f:
+            f.readline()  # skip header
+            offsets = [f.tell()]
+            for i in range(1, workers):
+                f.seek(max(size * i // workers, offsets[-1]))
+                f.readline()  # move to the start of the next line
+                offsets.append(f.tell())
+        offsets.append(size)
+        
+        chunks = [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+        self.stdout.write(f'Parsing {size} bytes in {len(chunks)} chunks...')
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                _parse_csv_chunk,
+                itertools.repeat(csv_file),
+                [start for start, _ in chunks],
+                [end for _, end in chunks],
+            )
+            for chunk_rows in results:
+                yield from chunk_rows
+
+    def _geocode_missing(self, limit, concurrency, min_delay_seconds, geocoder_url):
+        """Geocode stations without coordinates and save them. Returns the number geocoded."""
+        stations = FuelStation.objects.filter(
+            Q(latitude__isnull=True) | Q(longitude__isnull=True)
+        ).only('id', 'truckstop_name', 'address', 'city', 'state')
+        if limit:
+            stations = stations[:limit]
+        stations = list(stations)
+        if not stations:
+            return 0
+        
+        self.stdout.write(
+            f'Geocoding {len(stations)} stations '
+            f'(concurrency={concurrency}, delay={min_delay_seconds}s)...'
+        )
+        # Preload the geocode cache once; new hits are saved with the stations they came from
+        cache_map = {
+            key: (lat, lon)
+            for key, lat, lon in GeocodeCache.objects.values_list(
+                'address_key', 'latitude', 'longitude'
+            )
+        }
+        new_cache_entries = {}
+        results = self._geocode_all(
+            stations,
+            concurrency,
+            min_delay_seconds,
+            geocoder_url,
+            cache_map,
+            new_cache_entries,
+        )
+        
+        # Results are saved in batches as lookups finish, so an interrupted run keeps what it
+        # found and --geocode-only picks up the rest. The loop is only driven between saves,
+        # so the ORM is never called while it runs.
+        loop = asyncio.new_event_loop()
+        geocoded = 0
+        pending = []
+        try:
+            while True:
+                try:
+                    station = loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+                if station is None:
+                    continue
+                geocoded += 1
+                pending.append(station)
+                if len(pending) >= self.GEOCODE_SAVE_EVERY:
+                    self._save_geocoded(pending, new_cache_entries)
+        finally:
+            try:
+                self._save_geocoded(pending, new_cache_entries)
+            finally:
+                loop.run_until_complete(results.aclose())
+                loop.close()
+        
+        return geocoded
+
+    def _save_geocoded(self, stations, new_cache_entries):
+        """Write geocoded stations and new cache entries in one transaction and clear both"""
+        if not stations and not new_cache_entries:
+            return
+        self._stamp_updated_at(stations)
+        with transaction.atomic():
+            FuelStation.objects.bulk_update(
+                stations,
+                fields=['latitude', 'longitude', 'updated_at'],
+                batch_size=self.BATCH_SIZE,
+            )
+            GeocodeCache.objects.bulk_create(
+                [
+                    GeocodeCache(address_key=key, latitude=lat, longitude=lon)
+                    for key, (lat, lon) in new_cache_entries.items()
+                ],
+                batch_size=self.BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+        stations.clear()
+        new_cache_entries.clear()
+
+    def _stamp_updated_at(self, stations, now=None):
+        """
+        Set updated_at on stations written with bulk_update() or COPY, neither of which
+        applies auto_now. The station table version behind route ETags reads updated_at.
+        """
+        now = now or timezone.now()
+        for station in stations:
+            station.updated_at = now
+
+    def _flush(self, to_create, to_update):
+        """Write pending stations to the database in one transaction and clear the queues"""
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                self._copy_flush(to_create, to_update)
+            else:
+                if to_create:
+                    FuelStation.objects.bulk_create(to_create.values(), batch_size=self.BATCH_SIZE)
+                if to_update:
+                    self._stamp_updated_at(to_update.values())
+                    FuelStation.objects.bulk_update(
+                        to_update.values(),
+                        fields=[*self.UPDATE_FIELDS, 'updated_at'],
+                        batch_size=self.BATCH_SIZE,
+                    )
+        to_create.clear()
+        to_update.clear()
+
+    def _copy_flush(self, to_create, to_update):
+        """
+        PostgreSQL fast path: COPY new stations straight into the table, and
+        COPY updates into a temp table applied with a single UPDATE ... FROM.
+        """
+        table = connection.ops.quote_name(FuelStation._meta.db_table)
+        now = timezone.now()
+        
+        with connection.cursor() as cursor:
+            if to_create:
+                columns = ['opis_truckstop_id', *self.UPDATE_FIELDS, 'created_at', 'updated_at']
+                self._stamp_updated_at(to_create.values(), now)
+                for station in to_create.values():
+                    station.created_at = now
+                self._copy_rows(cursor, table, columns, to_create.values())
+                
+                # COPY doesn't return ids; fetch them so later updates can use the instances
+                ids = dict(
+                    FuelStation.objects.filter(opis_truckstop_id__in=to_create.keys())
+                    .values_list('opis_truckstop_id', 'id')
+                )
+                for opis_id, station in to_create.items():
+                    station.pk = ids[opis_id]
+                    station._state.adding = False
+            
+            if to_update:
+                columns = ['opis_truckstop_id', *self.UPDATE_FIELDS, 'updated_at']
+                self._stamp_updated_at(to_update.values(), now)
+                column_list = ', '.join(columns)
+                cursor.execute(
+                    f'CREATE TEMP TABLE fuel_station_copy AS '
+                    f'SELECT {column_list} FROM {table} WITH NO DATA'
+                )
+                self._copy_rows(cursor, 'fuel_station_copy', columns, to_update.values())
+                assignments = ', '.join(f'{column} = s.{column}' for column in columns[1:])
+                cursor.execute(
+                    f'UPDATE {table} AS t SET {assignments} FROM fuel_station_copy AS s '
+                    f'WHERE t.opis_truckstop_id = s.opis_truckstop_id'
+                )
+                cursor.execute('DROP TABLE fuel_station_copy')
+
+    def _copy_rows(self, cursor, table, columns, stations):
+        """Stream station rows into table with COPY FROM STDIN"""
+        buffer = io.StringIO()
+        for station in stations:
+            buffer.write('\t'.join(_copy_value(getattr(station, column)) for column in columns))
+            buffer.write('\n')
+        
+        sql = f'COPY {table} ({", ".join(columns)}) FROM STDIN'
+        if hasattr(cursor, 'copy_expert'):  # psycopg2
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
 
+    async def _geocode_all(self, stations, concurrency, min_delay_seconds, geocoder_url,
+                           cache_map, new_cache_entries):
+        """
+        Geocode stations concurrently, keeping request starts at least
+        min_delay_seconds apart. Queries found in cache_map skip the network;
+        new results are added to both cache_map and new_cache_entries.
+        Each distinct query (e.g. a shared "city, state" fallback) is sent at
+        most once per run, including misses and requests still in flight.
+        Address formats are tried in order of how often each has succeeded
+        so far in the run.
+        Yields each station in the order its lookups finish: the station once it
+        has coordinates, or None if it could not be geocoded.
+        """
+        geocoder_options = {}
+        if geocoder_url:
+            url = urlsplit(geocoder_url)
+            geocoder_options = {'scheme': url.scheme or 'https', 'domain': url.netloc or url.path}
+        
+        async with Nominatim(
+            user_agent="fuel_optimization_app",
+            timeout=10,
+            adapter_factory=AioHTTPAdapter,
+            **geocoder_options,
+        ) as geolocator:
+            # The rate limiter is the only pacing: misses don't sleep, and
+            # service errors are retried after a back-off before giving up
+            geocode = AsyncRateLimiter(
+                geolocator.geocode,
+                min_delay_seconds=min_delay_seconds,
+                max_retries=2,
+                error_wait_seconds=max(2.0, min_delay_seconds),
+                swallow_exceptions=False,
+            )
+            semaphore = asyncio.Semaphore(concurrency)
+            lookups = collections.OrderedDict()  # address_key -> task resolving to a Location or None
+            format_hits = collections.Counter()  # format name -> successful lookups
+            # Warnings are written in batches instead of from inside the network loop
+            warnings = []
+            
+            async def geocode_station(station):
+                async with semaphore:
+                    coords = await self._geocode_station(
+                        geocode, station, cache_map, new_cache_entries, lookups, format_hits,
+                        warnings,
+                    )
+                if coords:
+                    station.latitude, station.longitude = coords
+                    return station
+                warnings.append(
+                    f'Could not geocode: {station.truckstop_name}, {station.city}, {station.state}'
+                )
+                return None
+            
+            tasks = [asyncio.ensure_future(geocode_station(s)) for s in stations]
+            try:
+                for done in asyncio.as_completed(tasks):
+                    yield await done
+                    if len(warnings) >= self.PROGRESS_EVERY:
+                        self.stdout.write(self.style.WARNING('\n'.join(warnings)))
+                        warnings.clear()
+            finally:
+                # Stopped early (error or interrupt): don't leave lookups running
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if warnings:
+                    self.stdout.write(self.style.WARNING('\n'.join(warnings)))
+
+    async def _geocode_station(self, geocode, station, cache_map, new_cache_entries,
+                               lookups, format_hits, warnings):
+        """Try multiple address formats for a station and return the first (lat, lon) match"""
+        truckstop_name = station.truckstop_name
+        address = station.address
+        city = station.city
+        state = station.state
+        
+        # Try multiple address formats
+        address_formats = [
+            ('name', f"{truckstop_name}, {city}, {state}, USA"),  # Try with business name
+            ('city_state', f"{city}, {state}, USA"),  # Fallback to city/state
+            ('address', f"{address}, {city}, {state}, USA"),  # Original format
+        ]
+        
+        # If address contains highway/interstate info, city and state are more
+        # reliable than the exit description, so try them first
+        if 'I-' in address or 'US-' in address or 'EXIT' in address.upper():
+            address_formats[0], address_formats[1] = address_formats[1], address_formats[0]
+        
+        # Prefer the formats that have been winning this run (stable sort keeps
+        # the default order until there is evidence)
+        address_formats.sort(key=lambda item: -format_hits[item[0]])
+        
+        for format_name, addr_format in address_formats:
+            key = address_key(addr_format)
+            if key in cache_map:
+                format_hits[format_name] += 1
+                return cache_map[key]
+            try:
+                task = lookups.get(key)
+                if task is None:
+                    task = lookups[key] = asyncio.ensure_future(geocode(addr_format))
+                    if len(lookups) > self.GEOCODE_MEMO_SIZE:
+                        lookups.popitem(last=False)
+                else:
+                    lookups.move_to_end(key)
+                location = await task
+                if location:
+                    coords = (round(location.latitude, 6), round(location.longitude, 6))
+                    cache_map[key] = coords
+                    new_cache_entries[key] = coords
+                    format_hits[format_name] += 1
+                    # Hits live on in cache_map; only misses need to stay memoized
+                    lookups.pop(key, None)
+                    return coords
+            except (GeocoderTimedOut, GeocoderServiceError) as e:
+                # Don't memoize failures so a later row can retry the query
+                lookups.pop(key, None)
+                warnings.append(f'Geocoding error for {addr_format}: {e}')
+                continue
+        
+        return None
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-14 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel_route', '0002_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fuelstation',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='fuelstation',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='geocodecache',
+            name='latitude',
+            field=models.FloatField(),
+        ),
+        migrations.AlterField(
+            model_name='geocodecache',
+            name='longitude',
+            field=models.FloatField(),
+        ),
+    ]
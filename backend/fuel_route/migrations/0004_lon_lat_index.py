@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel_route', '0003_float_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuelstation',
+            index=models.Index(fields=['longitude', 'latitude'], name='fuel_lon_lat_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-14 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel_route', '0004_lon_lat_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuelstation',
+            index=models.Index(fields=['state', 'retail_price'], name='fuel_state_price_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Admin search runs icontains over these columns. On PostgreSQL that compiles
+# to UPPER(col::text) LIKE UPPER('%q%'), so the trigram indexes are built on
+# the same expression. Other backends have no trigram support and skip this.
+TRIGRAM_INDEXES = {
+    'fuel_name_trgm': 'truckstop_name',
+    'fuel_city_trgm': 'city',
+    'fuel_address_trgm': 'address',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON fuel_route_fuelstation '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fuel_route', '0005_state_price_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -12,8 +12,8 @@ class FuelStation(models.Model):
     retail_price = models.DecimalField(max_digits=6, decimal_places=4)
     
     # Geocoded location (latitude, longitude)
-    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
-    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -23,8 +23,25 @@ class FuelStation(models.Model):
         ordering = ['state', 'city', 'truckstop_name']
         indexes = [
             models.Index(fields=['latitude', 'longitude']),
+            # Lets bounding-box lookups lead with longitude for north-south routes,
+            # whose latitude range alone matches most of the table
+            models.Index(fields=['longitude', 'latitude'], name='fuel_lon_lat_idx'),
             models.Index(fields=['state']),
+            # Cheapest-station-in-state lookups (filter by state, order by price)
+            models.Index(fields=['state', 'retail_price'], name='fuel_state_price_idx'),
         ]
     
     def __str__(self):
         return f"{self.truckstop_name} - {self.city}, {self.state}"
+
+
+class GeocodeCache(models.Model):
+    """Cache of geocoded addresses, keyed by normalized query string"""
+    address_key = models.CharField(max_length=512, unique=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.address_key} ({self.latitude}, {self.longitude})"
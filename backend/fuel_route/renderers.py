@@ -0,0 +1,31 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Route responses are mostly long lists of floats (geometries, stations),
+    which orjson encodes several times faster than json.dumps. NumPy arrays
+    can be returned as-is. Types orjson does not know (Decimal, lazy strings,
+    querysets) go through DRF's own encoder, so output matches JSONRenderer.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    _fallback = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = self.options
+        # The browsable API asks for indented output via the media type params
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=self._fallback, option=options)
@@ -1,8 +1,76 @@
+import math
+
 from rest_framework import serializers
 
 
-class RoutePlanSerializer(serializers.Serializer):
+def _has_prohibited_characters(value):
+    """NUL or lone surrogate code points, which CharField's default validators reject"""
+    if '\x00' in value:
+        return True
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        return True
+    return False
+
+
+class FastValidationMixin:
+    """
+    Cheap validation for the small, flat request bodies these endpoints take.
+
+    validate_fast() checks the common well-formed shapes inline and returns the
+    validated dict, or None when anything is unusual (wrong types, bounds,
+    unknown choices, characters CharField prohibits). Callers fall back to the
+    regular serializer on None, so error responses are still produced by DRF
+    and stay identical.
+    """
+    FAST_DEFAULTS = {}
+    FAST_CHOICES = {}
+    FAST_BOUNDS = {}
+
+    @classmethod
+    def validate_fast(cls, data):
+        if not isinstance(data, dict):
+            return None
+
+        validated = {}
+        for name in ('start_location', 'end_location'):
+            value = data.get(name)
+            if not isinstance(value, str):
+                return None
+            value = value.strip()
+            if not value or _has_prohibited_characters(value):
+                return None
+            validated[name] = value
+
+        for name, default in cls.FAST_DEFAULTS.items():
+            value = data.get(name, default)
+            if value is None:
+                if default is not None:
+                    return None
+            elif name in cls.FAST_CHOICES:
+                if value not in cls.FAST_CHOICES[name]:
+                    return None
+            else:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return None
+                value = float(value)
+                if not math.isfinite(value):
+                    return None
+                low, high = cls.FAST_BOUNDS.get(name, (None, None))
+                if (low is not None and value < low) or (high is not None and value > high):
+                    return None
+            validated[name] = value
+
+        return validated
+
+
+class RoutePlanSerializer(FastValidationMixin, serializers.Serializer):
     """Serializer for route planning request"""
+    FAST_DEFAULTS = {'max_distance_km': 5.0, 'algorithm': 'greedy', 'initial_fuel_gallons': None}
+    FAST_CHOICES = {'algorithm': ('greedy', 'dijkstra')}
+    FAST_BOUNDS = {'initial_fuel_gallons': (0.0, 50.0)}
+
     start_location = serializers.CharField(
         help_text="Start location (e.g., 'New York, NY' or '40.7128,-74.0060')"
     )
@@ -38,8 +106,10 @@ class RoutePlanResponseSerializer(serializers.Serializer):
     total_fuel_gallons = serializers.FloatField()
 
 
-class RouteOptimizeSerializer(serializers.Serializer):
+class RouteOptimizeSerializer(FastValidationMixin, serializers.Serializer):
     """Serializer for route optimization request"""
+    FAST_DEFAULTS = {'max_distance_km': 5.0}
+
     start_location = serializers.CharField(
         help_text="Start location (e.g., 'New York, NY' or '40.7128,-74.0060')"
     )
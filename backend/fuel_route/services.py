@@ -2,13 +2,29 @@
 Services for routing and fuel optimization
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
 import math
 import json
+import orjson
 import heapq
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime
 from typing import List, Tuple, Dict, Optional
 from django.conf import settings
-from geopy.distance import geodesic
-import polyline
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Max
+from django.db.models.functions import Cast, Round
+from geopy.adapters import RequestsAdapter
+from geopy.geocoders import Nominatim
+import numpy as np
+
+from .models import FuelStation
 
 import logging
 
@@ -20,12 +36,350 @@ logger = logging.getLogger(__name__)
 # urllib3_logger.setLevel(logging.DEBUG)
 # urllib3_logger.propagate = True
 
+EARTH_RADIUS_M = 6371008.8  # mean Earth radius
+KM_PER_MILE = 1.609344
+MILES_PER_KM = 1 / KM_PER_MILE
+
+
+def _segment_lengths_m(geometry: List[List[float]]) -> np.ndarray:
+    """Haversine length of each segment of a [lon, lat] polyline in meters"""
+    coords = np.radians(np.asarray(geometry, dtype=np.float64))
+    if len(coords) < 2:
+        return np.zeros(0)
+    lon, lat = coords[:, 0], coords[:, 1]
+    dlat = lat[1:] - lat[:-1]
+    dlon = lon[1:] - lon[:-1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def path_length_meters(geometry: List[List[float]]) -> float:
+    """Haversine length of a [lon, lat] polyline in meters, computed in one vectorized pass"""
+    return float(_segment_lengths_m(geometry).sum())
+
+
+def route_cumulative_km(geometry: List[List[float]]) -> np.ndarray:
+    """Distance in km from the start of the route to each of its points"""
+    return np.concatenate(([0.0], np.cumsum(_segment_lengths_m(geometry)) / 1000))
+
+
+def nearest_route_segments(points: List[Tuple[float, float]], geometry: List[List[float]],
+                           max_pairs: int = 1_000_000) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Distance in km from each (lon, lat) point to its nearest route segment, that
+    segment's index, and the fraction (0..1) of the way along it where the closest
+    point lies, for all points at once.
+    
+    Uses an equirectangular approximation around each point (111 km per degree latitude,
+    111*cos(lat) per degree longitude), broadcast over points x segments in chunks of at
+    most max_pairs pairs to bound memory.
+    """
+    route = np.asarray(geometry, dtype=np.float64)
+    starts = route[:-1]
+    deltas = route[1:] - starts
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    distances = np.empty(len(points))
+    indices = np.empty(len(points), dtype=np.int64)
+    fractions = np.zeros(len(points))
+    if len(points) == 0 or len(starts) == 0:
+        distances.fill(np.inf)
+        indices.fill(0)
+        return distances, indices, fractions
+    
+    chunk = max(1, max_pairs // len(starts))
+    for lo in range(0, len(points), chunk):
+        block = points[lo:lo + chunk]
+        # km per degree at each point's latitude
+        lon_scale = (111.0 * np.cos(np.radians(block[:, 1])))[:, None]
+        px = (block[:, 0:1] - starts[:, 0]) * lon_scale
+        py = (block[:, 1:2] - starts[:, 1]) * 111.0
+        abx = deltas[:, 0] * lon_scale
+        aby = np.broadcast_to(deltas[:, 1] * 111.0, abx.shape)
+        seg_len_sq = abx * abx + aby * aby
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(seg_len_sq > 0, (px * abx + py * aby) / seg_len_sq, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        dist = np.hypot(px - t * abx, py - t * aby)
+        nearest = np.argmin(dist, axis=1)
+        rows = np.arange(len(block))
+        indices[lo:lo + chunk] = nearest
+        distances[lo:lo + chunk] = dist[rows, nearest]
+        fractions[lo:lo + chunk] = t[rows, nearest]
+    return distances, indices, fractions
+
+
+def route_distance_at(cumulative_km: np.ndarray, indices: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """Distance in km along the route to points `fractions` of the way along segments `indices`"""
+    return np.interp(indices + fractions, np.arange(len(cumulative_km)), cumulative_km)
+
+
+def route_bounding_box(geometry: List[List[float]],
+                       max_distance_km: float) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) of a [lon, lat] route in one NumPy pass, expanded
+    by max_distance_km (~111 km per degree latitude, ~111*cos(mid latitude) per degree longitude)
+    """
+    route = np.asarray(geometry, dtype=np.float64)
+    min_lon, min_lat = route.min(axis=0).tolist()
+    max_lon, max_lat = route.max(axis=0).tolist()
+    avg_lat = (min_lat + max_lat) / 2
+    lat_deg_threshold = max_distance_km / 111.0
+    lon_deg_threshold = max_distance_km / (111.0 * math.cos(math.radians(avg_lat)))
+    return (
+        min_lat - lat_deg_threshold, max_lat + lat_deg_threshold,
+        min_lon - lon_deg_threshold, max_lon + lon_deg_threshold,
+    )
+
+
+def _great_circle_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Closed-form haversine distance in km between two points"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    sin_dlat = math.sin((phi2 - phi1) / 2)
+    sin_dlon = math.sin(math.radians(lon2 - lon1) / 2)
+    a = sin_dlat * sin_dlat + math.cos(phi1) * math.cos(phi2) * sin_dlon * sin_dlon
+    return 2 * EARTH_RADIUS_M / 1000 * math.asin(math.sqrt(min(a, 1.0)))
+
+
+# Columns read for optimizer dicts; the price is cast to float in SQL (see _station_rows)
+STATION_FIELDS = (
+    'id', 'truckstop_name', 'address', 'city', 'state', 'latitude', 'longitude', 'price_float',
+)
+
+def _station_rows(queryset):
+    """STATION_FIELDS tuples for a FuelStation queryset, with no Decimal objects built"""
+    # Rounded to the field's scale first: SQLite keeps whatever digits were written
+    decimal_places = FuelStation._meta.get_field('retail_price').decimal_places
+    return queryset.annotate(
+        price_float=Cast(Round('retail_price', decimal_places), FloatField())
+    ).values_list(*STATION_FIELDS)
+
+
+# Positions of the coordinates in station rows
+_ROW_LAT = STATION_FIELDS.index('latitude')
+_ROW_LON = STATION_FIELDS.index('longitude')
+
+
+def station_row_dicts(rows) -> List[Dict]:
+    """Convert station row tuples (see queryset_station_rows) to the dict shape the optimizer works with"""
+    return [
+        {
+            'id': station_id,
+            'name': name,
+            'address': f"{address}, {city}, {state}",
+            'lat': lat,
+            'lon': lon,
+            'price': price,
+        }
+        for station_id, name, address, city, state, lat, lon, price in rows
+    ]
+
+
+def station_table_version() -> Tuple[int, Optional[datetime]]:
+    """Row count and latest updated_at of the fuel station table, which change with any write"""
+    version = FuelStation.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return version['count'], version['updated']
+
+
+def cached_station_table_version() -> Tuple[int, Optional[datetime]]:
+    """
+    station_table_version() kept in the Django cache for STATION_VERSION_CACHE_TIMEOUT
+    seconds, for HTTP validators that are checked on every request. The save/delete
+    signals drop it; bulk writes show up once it expires.
+    """
+    timeout = getattr(settings, 'STATION_VERSION_CACHE_TIMEOUT', 60)
+    return tuple(cache.get_or_set('fs:version', station_table_version, timeout))
+
+
+def queryset_station_rows(queryset) -> List[Tuple]:
+    """Evaluate a FuelStation queryset once, to STATION_FIELDS tuples (no model instances or dicts)"""
+    return list(_station_rows(queryset))
+
+
+def queryset_station_dicts(queryset) -> List[Dict]:
+    """Evaluate a FuelStation queryset once, straight to optimizer dicts (no model instances)"""
+    return station_row_dicts(_station_rows(queryset))
+
+
+def invalidate_station_table_version():
+    """Drop the cached station_table_version() so the next request's validators see the write"""
+    cache.delete('fs:version')
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """
+    Decode an encoded polyline straight into [lon, lat] pairs.
+    
+    Every character carries 5 value bits plus a continuation bit, so the varints are
+    reassembled with array ops (chunk boundaries, shifts, reduceat) and the deltas are
+    accumulated with cumsum, instead of a Python loop per character.
+    """
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    if chunks.size == 0:
+        return []
+    if chunks.min() < 0 or chunks[-1] & 0x20:
+        raise ValueError('Invalid polyline')
+    
+    ends = (chunks & 0x20) == 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    position = np.arange(chunks.size) - np.repeat(starts, np.diff(np.append(starts, chunks.size)))
+    values = np.add.reduceat((chunks & 0x1f) << (5 * position), starts)
+    if values.size % 2:
+        raise ValueError('Invalid polyline')
+    
+    # Zigzag decoding, then deltas -> absolute (lat, lon)
+    deltas = (values >> 1) ^ -(values & 1)
+    coords = np.cumsum(deltas.reshape(-1, 2), axis=0) / 10 ** precision
+    return coords[:, ::-1].tolist()
+
+
+class GeocodingService:
+    """Service to geocode free-form locations with Nominatim"""
+    
+    USER_AGENT = "fuel_optimization_app"
+    TIMEOUT = 10
+    # Nominatim's usage policy allows one request per second. Request starts are spaced
+    # process-wide, so concurrent lookups overlap in flight but never start closer together.
+    MIN_DELAY_SECONDS = 1.0
+    _next_slot = 0.0
+    _slot_lock = threading.Lock()
+    
+    # One geolocator per process; its pooled requests session keeps the TLS connection to
+    # Nominatim alive across requests (views build a new GeocodingService each time)
+    _geolocator = None
+    _geolocator_lock = threading.Lock()
+    
+    def __init__(self):
+        # Forward geocodes rarely change, so results are kept in the Django cache for long
+        self.cache_timeout = getattr(settings, 'GEOCODE_CACHE_TIMEOUT', 60 * 60 * 24 * 30)
+    
+    @classmethod
+    def _get_geolocator(cls) -> Nominatim:
+        if cls._geolocator is None:
+            with cls._geolocator_lock:
+                if cls._geolocator is None:
+                    cls._geolocator = Nominatim(
+                        user_agent=cls.USER_AGENT,
+                        timeout=cls.TIMEOUT,
+                        adapter_factory=partial(RequestsAdapter, pool_connections=4, pool_maxsize=16),
+                    )
+        return cls._geolocator
+    
+    @classmethod
+    def _reserve_slot(cls) -> float:
+        """Claim the next request start time and return how many seconds to wait for it"""
+        with cls._slot_lock:
+            now = time.monotonic()
+            start = max(now, cls._next_slot)
+            cls._next_slot = start + cls.MIN_DELAY_SECONDS
+        return start - now
+    
+    @staticmethod
+    def _cache_key(kind: str, query: str, country_codes: Optional[str]) -> str:
+        # Hashed so arbitrary user input is a valid key for every cache backend
+        digest = hashlib.blake2b(query.strip().lower().encode(), digest_size=16).hexdigest()
+        return f"geo:{kind}:{country_codes or ''}:{digest}"
+    
+    def geocode_many(self, queries: List[str],
+                     country_codes: Optional[str] = None) -> List[Optional[Tuple[float, float, str]]]:
+        """
+        Geocode several queries; returns (latitude, longitude, address) or None per query.
+        Cached queries skip the network, the rest are looked up concurrently.
+        """
+        keys = [self._cache_key('one', query, country_codes) for query in queries]
+        cached = cache.get_many(keys)
+        missing = [(key, query) for key, query in zip(keys, queries) if key not in cached]
+        if missing:
+            locations = self._geocode_all(
+                [query for _, query in missing], {'country_codes': country_codes}
+            )
+            # Misses aren't cached so a later request retries them
+            found = {
+                key: (location.latitude, location.longitude, location.address)
+                for (key, _), location in zip(missing, locations) if location
+            }
+            if found:
+                cache.set_many(found, self.cache_timeout)
+            cached.update(found)
+        return [cached.get(key) for key in keys]
+    
+    def suggest(self, query: str, country_codes: Optional[str] = None, limit: int = 5) -> List[Dict]:
+        """Up to `limit` matches for an autocomplete query, as display_name/latitude/longitude dicts"""
+        key = self._cache_key(f'list{limit}', query, country_codes)
+        suggestions = cache.get(key)
+        if suggestions is None:
+            locations, = self._geocode_all(
+                [query], {'country_codes': country_codes, 'exactly_one': False, 'limit': limit}
+            )
+            suggestions = [
+                {
+                    'display_name': location.address,
+                    'latitude': location.latitude,
+                    'longitude': location.longitude,
+                }
+                for location in locations or ()
+            ]
+            # Like geocode_many, empty results aren't cached so a later request retries them
+            if suggestions:
+                cache.set(key, suggestions, self.cache_timeout)
+        return suggestions
+    
+    def _geocode_all(self, queries: List[str], kwargs: Dict) -> List:
+        geolocator = self._get_geolocator()
+        if len(queries) == 1:
+            return [self._geocode_one(geolocator, queries[0], kwargs)]
+        # Lookups overlap in flight on the shared connection pool
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            return list(executor.map(lambda query: self._geocode_one(geolocator, query, kwargs), queries))
+    
+    def _geocode_one(self, geolocator: Nominatim, query: str, kwargs: Dict):
+        wait = self._reserve_slot()
+        if wait > 0:
+            time.sleep(wait)
+        return geolocator.geocode(query, timeout=self.TIMEOUT, **kwargs)
+
+
 class RoutingService:
     """Service to interact with routing APIs"""
     
+    # Process-wide LRU of recent routes, keyed on coordinates rounded to ~1 m. Decoded
+    # routes can hold thousands of points, so the cache is kept small.
+    ROUTE_CACHE_SIZE = 64
+    ROUTE_CACHE_PRECISION = 5
+    _route_cache = OrderedDict()
+    _route_cache_lock = threading.Lock()
+    
+    # One pooled HTTP session per process so keep-alive reuses the TLS connection to the
+    # routing API across requests (views build a new RoutingService each time)
+    _session = None
+    _session_lock = threading.Lock()
+    
     def __init__(self):
         self.provider = getattr(settings, 'ROUTING_API_PROVIDER', 'openrouteservice')
         self.api_key = getattr(settings, 'ROUTING_API_KEY', '')
+        # Shared with other worker processes through the Django cache when it is shared
+        # (ROUTE_SHARED_CACHE); driving routes between the same points rarely change
+        self.shared_cache = getattr(settings, 'ROUTE_SHARED_CACHE', False)
+        self.cache_timeout = getattr(settings, 'ROUTE_CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+    
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    session = requests.Session()
+                    # Directions requests are idempotent, so gateway errors are safe to retry
+                    retry = Retry(
+                        total=2,
+                        backoff_factor=0.2,
+                        status_forcelist=(502, 503, 504),
+                        allowed_methods=frozenset({'POST'}),
+                        raise_on_status=False,
+                    )
+                    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+                    session.headers.update({'Content-Type': 'application/json'})
+                    cls._session = session
+        return cls._session
     
     def get_route(self, start_lat: float, start_lon: float, 
                   end_lat: float, end_lon: float) -> Optional[Dict]:
@@ -33,11 +387,34 @@ class RoutingService:
         Get route from start to end location.
         Returns dict with 'geometry' (list of [lon, lat] coordinates) and 'distance' (meters)
         """
+        key = (self.provider,) + tuple(
+            round(value, self.ROUTE_CACHE_PRECISION)
+            for value in (start_lat, start_lon, end_lat, end_lon)
+        )
+        with self._route_cache_lock:
+            route = self._route_cache.get(key)
+            if route is not None:
+                self._route_cache.move_to_end(key)
+                return route
+        
         if self.provider == 'openrouteservice':
-            return self._get_route_openrouteservice(start_lat, start_lon, end_lat, end_lon)
+            shared_key = 'route:' + ':'.join(str(part) for part in key)
+            route = cache.get(shared_key) if self.shared_cache else None
+            if route is None:
+                route = self._get_route_openrouteservice(start_lat, start_lon, end_lat, end_lon)
+                if route is not None and self.shared_cache:
+                    cache.set(shared_key, route, self.cache_timeout)
         else:
-            # Fallback: simple straight-line approximation
-            return self._get_route_fallback(start_lat, start_lon, end_lat, end_lon)
+            # Fallback: simple straight-line approximation (cheap, so only kept in the local LRU)
+            route = self._get_route_fallback(start_lat, start_lon, end_lat, end_lon)
+        
+        # Failed lookups aren't cached so the next request retries the API
+        if route is not None:
+            with self._route_cache_lock:
+                self._route_cache[key] = route
+                if len(self._route_cache) > self.ROUTE_CACHE_SIZE:
+                    self._route_cache.popitem(last=False)
+        return route
     
     def _get_route_openrouteservice(self, start_lat: float, start_lon: float,
                                      end_lat: float, end_lon: float) -> Optional[Dict]:
@@ -51,9 +428,6 @@ class RoutingService:
                        start_lat, start_lon, end_lat, end_lon)
 
             url = f"https://api.openrouteservice.org/v2/directions/driving-car?api_key={self.api_key}"
-            headers = {
-                'Content-Type': 'application/json',
-            }
             body = {
                 'coordinates': [
                     [start_lon, start_lat],
@@ -62,11 +436,11 @@ class RoutingService:
                 'format': 'geojson'
             }
             
-            response = requests.post(url, json=body, headers=headers, timeout=10)
+            response = self._get_session().post(url, json=body, timeout=10)
             
             if not response.ok:
                 try:
-                    error_data = response.json()
+                    error_data = orjson.loads(response.content)
                     logger.error('Route API error response: %s', error_data)
                     error_message = error_data.get('error', {}).get('message', 
                                                                     f'Routing failed: {response.status_text}')
@@ -75,7 +449,8 @@ class RoutingService:
                     logger.error('Route API error: %s', response.status_text)
                     raise Exception(f'Routing failed: {response.status_text}')
             
-            data = response.json()
+            # orjson parses the raw bytes directly; large GeoJSON routes parse several times faster
+            data = orjson.loads(response.content)
             
             # Handle GeoJSON format response (format='geojson')
             if isinstance(data, dict) and data.get('type') == 'FeatureCollection' and data.get('features'):
@@ -98,12 +473,7 @@ class RoutingService:
                     
                     # If distance not in properties, calculate from geometry
                     if distance is None:
-                        total_distance = 0
-                        for i in range(len(geometry) - 1):
-                            point1 = (geometry[i][1], geometry[i][0])  # (lat, lon)
-                            point2 = (geometry[i+1][1], geometry[i+1][0])
-                            total_distance += geodesic(point1, point2).meters
-                        distance = total_distance
+                        distance = path_length_meters(geometry)
                     
                     return {
                         'geometry': geometry,
@@ -118,9 +488,8 @@ class RoutingService:
                     if isinstance(route['geometry'], str):
                         # Geometry is encoded polyline, need to decode it
                         try:
-                            geometry = polyline.decode(route['geometry'])
-                            # Convert from (lat, lon) to [lon, lat]
-                            geometry = [[lon, lat] for lat, lon in geometry]
+                            # Decodes straight to [lon, lat]
+                            geometry = decode_polyline(route['geometry'])
                         except Exception as e:
                             logger.error('Error decoding polyline: %s', e)
                             return None
@@ -149,8 +518,8 @@ class RoutingService:
     def _get_route_fallback(self, start_lat: float, start_lon: float,
                             end_lat: float, end_lon: float) -> Dict:
         """Fallback: create a simple straight-line route with intermediate points"""
-        # Calculate distance
-        distance_km = geodesic((start_lat, start_lon), (end_lat, end_lon)).kilometers
+        # Calculate distance (a straight line sampled every ~10km doesn't need geodesic accuracy)
+        distance_km = _great_circle_km(start_lat, start_lon, end_lat, end_lon)
         distance_m = distance_km * 1000
         
         # Create intermediate points (every ~10km)
@@ -172,7 +541,7 @@ class RoutingService:
                                 max_points: int = 300) -> List[List[float]]:
         """
         Optimize route geometry by reducing the number of points while preserving route shape.
-        Uses Douglas-Peucker-like algorithm to keep important waypoints.
+        Uses Ramer-Douglas-Peucker, with the tolerance chosen so that at most max_points remain.
         
         Args:
             route_geometry: List of [lon, lat] coordinates
@@ -187,61 +556,15 @@ class RoutingService:
         logger.info("Optimizing route geometry: %d points -> %d points", 
                    len(route_geometry), max_points)
         
-        # Always keep first and last points
-        optimized = [route_geometry[0]]
-        
-        # Calculate step size to sample points
-        step = len(route_geometry) / max_points
+        if max_points < 2:
+            return [route_geometry[0], route_geometry[-1]]
         
-        # Sample points evenly, but also include points with significant direction changes
-        last_idx = 0
-        for i in range(1, len(route_geometry) - 1):
-            # Always include points at regular intervals
-            if i - last_idx >= step:
-                optimized.append(route_geometry[i])
-                last_idx = i
-            # Also include points with significant direction changes
-            elif i > 1 and i < len(route_geometry) - 1:
-                # Calculate angle change
-                p1 = route_geometry[i-1]
-                p2 = route_geometry[i]
-                p3 = route_geometry[i+1]
-                
-                # Calculate vectors
-                v1_lat = p2[1] - p1[1]
-                v1_lon = p2[0] - p1[0]
-                v2_lat = p3[1] - p2[1]
-                v2_lon = p3[0] - p2[0]
-                
-                # Calculate angle between vectors (simplified)
-                dot = v1_lat * v2_lat + v1_lon * v2_lon
-                mag1 = math.sqrt(v1_lat**2 + v1_lon**2)
-                mag2 = math.sqrt(v2_lat**2 + v2_lon**2)
-                
-                if mag1 > 0 and mag2 > 0:
-                    cos_angle = dot / (mag1 * mag2)
-                    cos_angle = max(-1, min(1, cos_angle))  # Clamp to [-1, 1]
-                    angle = math.acos(cos_angle)
-                    
-                    # Include point if angle change is significant (> 15 degrees)
-                    if angle > math.radians(15):
-                        if route_geometry[i] not in optimized:
-                            optimized.append(route_geometry[i])
-                            last_idx = i
+        # Split spans in order of decreasing deviation; the first max_points - 2 splits
+        # are exactly the RDP result for the tightest tolerance that fits the budget
+        keep = _rdp_top_indices(np.asarray(route_geometry, dtype=np.float64), max_points - 2)
         
-        # Always keep last point
-        if route_geometry[-1] not in optimized:
-            optimized.append(route_geometry[-1])
-        
-        # If still too many points, do uniform sampling
-        if len(optimized) > max_points:
-            step = len(optimized) / max_points
-            final_optimized = [optimized[0]]
-            for i in range(1, len(optimized) - 1):
-                if int(i * step) > int((i-1) * step):
-                    final_optimized.append(optimized[i])
-            final_optimized.append(optimized[-1])
-            optimized = final_optimized
+        last = len(route_geometry) - 1
+        optimized = [route_geometry[i] for i in (0, *keep, last)]
         
         logger.info("Route optimization complete: %d points (target: %d)", 
                    len(optimized), max_points)
@@ -249,6 +572,119 @@ class RoutingService:
         return optimized
 
 
+def _rdp_split(coords: np.ndarray, first: int, last: int) -> Tuple[float, int]:
+    """Return (deviation, index) of the point between first and last farthest from their chord"""
+    points = coords[first + 1:last]
+    ax, ay = coords[first]
+    dx, dy = coords[last] - coords[first]
+    seg_len_sq = dx * dx + dy * dy
+    if seg_len_sq > 0:
+        t = np.clip(((points[:, 0] - ax) * dx + (points[:, 1] - ay) * dy) / seg_len_sq, 0.0, 1.0)
+    else:
+        t = 0.0
+    dist = np.hypot(points[:, 0] - (ax + t * dx), points[:, 1] - (ay + t * dy))
+    split = int(np.argmax(dist))
+    return float(dist[split]), split + first + 1
+
+
+def _rdp_top_indices(coords: np.ndarray, count: int, min_deviation: float = 1e-9) -> List[int]:
+    """
+    Ramer-Douglas-Peucker with a point budget instead of a tolerance.
+    
+    Spans wait in a max-heap keyed by their largest deviation, so interior points are
+    kept in the order RDP would keep them as its tolerance shrinks. Stops after count
+    points, which costs O(count) vectorized span scans instead of a tolerance search,
+    or earlier once the remaining spans are straight (deviation <= min_deviation) since
+    further points wouldn't change the shape. Returns the kept interior indices in route order.
+    """
+    heap = []
+    
+    def push(first, last):
+        if last - first >= 2:
+            deviation, split = _rdp_split(coords, first, last)
+            heapq.heappush(heap, (-deviation, split, first, last))
+    
+    push(0, len(coords) - 1)
+    kept = []
+    while heap and len(kept) < count and -heap[0][0] > min_deviation:
+        _, split, first, last = heapq.heappop(heap)
+        kept.append(split)
+        push(first, split)
+        push(split, last)
+    
+    kept.sort()
+    return kept
+
+
+# Slack on range checks: station positions arrive in km and are converted to miles, so a
+# station exactly one tank away can land a hair past the range
+RANGE_TOLERANCE_MILES = 1e-6
+
+
+def _greedy_core(stop_miles: np.ndarray, stop_prices: np.ndarray, total_miles: float,
+                 initial_fuel: float, mpg: float, capacity: float):
+    """
+    Greedy refueling loop over stop positions (miles, sorted) and prices.
+    
+    From the current position, pick the cheapest stop reachable with current fuel and
+    refuel to capacity, or only what's needed (plus a small buffer) once the end is in
+    range of a full tank. Returns (chosen indices, fuel at arrival, gallons bought, cost
+    per stop, final position, stranded) where stranded means neither the end nor any
+    stop was reachable.
+    """
+    chosen = []
+    arrival_fuel = []
+    purchased = []
+    costs = []
+    # Stops at or behind the current position are never reachable again, so a cursor
+    # over the sorted stops replaces tracking visited ones
+    next_idx = 0
+    fuel = initial_fuel
+    position = 0.0
+    full_tank_miles = capacity * mpg
+    
+    while position < total_miles:
+        range_miles = fuel * mpg + RANGE_TOLERANCE_MILES
+        if total_miles - position <= range_miles:
+            return chosen, arrival_fuel, purchased, costs, position, False
+        
+        # Reachable window: ahead of us and within range
+        lo = next_idx + int(np.searchsorted(stop_miles[next_idx:], position, side='right'))
+        hi = lo + int(np.searchsorted(stop_miles[lo:], position + range_miles, side='right'))
+        if lo == hi:
+            return chosen, arrival_fuel, purchased, costs, position, True
+        
+        # Cheapest reachable stop (first on ties)
+        idx = lo + int(np.argmin(stop_prices[lo:hi]))
+        stop_position = float(stop_miles[idx])
+        fuel = max(fuel - (stop_position - position) / mpg, 0.0)
+        fuel_at_arrival = fuel
+        
+        remaining_miles = total_miles - stop_position
+        if remaining_miles <= full_tank_miles:
+            # Last stop - only refuel enough to reach the end
+            fuel_needed = remaining_miles / mpg - fuel
+            if fuel_needed <= 0:
+                fuel_added = 0.1  # Small buffer for safety
+            else:
+                fuel_added = min(fuel_needed, capacity - fuel)
+                # Add a small buffer (5% or 0.1 gallons, whichever is larger), within capacity
+                fuel_added = min(fuel_added + max(0.1, fuel_added * 0.05), capacity - fuel)
+            fuel += fuel_added
+        else:
+            fuel_added = capacity - fuel
+            fuel = capacity
+        
+        chosen.append(idx)
+        arrival_fuel.append(fuel_at_arrival)
+        purchased.append(fuel_added)
+        costs.append(fuel_added * float(stop_prices[idx]))
+        next_idx = idx + 1
+        position = stop_position
+    
+    return chosen, arrival_fuel, purchased, costs, position, False
+
+
 class FuelOptimizer:
     """Service to optimize fuel stops along a route"""
     
@@ -259,7 +695,7 @@ class FuelOptimizer:
     def __init__(self, vehicle_range_miles: float = 500, fuel_efficiency_mpg: float = 10):
         self.vehicle_range_miles = vehicle_range_miles
         self.fuel_efficiency_mpg = fuel_efficiency_mpg
-        self.vehicle_range_km = vehicle_range_miles * 1.60934  # Convert to km
+        self.vehicle_range_km = vehicle_range_miles * KM_PER_MILE  # Convert to km
     
     def find_optimal_stops(self, route_geometry: List[List[float]], 
                           fuel_stations: List, 
@@ -268,7 +704,8 @@ class FuelOptimizer:
                           end_lat: float = None,
                           end_lon: float = None,
                           initial_fuel_gallons: float = None,
-                          algorithm: str = 'greedy') -> List[Dict]:
+                          algorithm: str = 'greedy',
+                          total_distance_m: float = None) -> List[Dict]:
         """
         Find optimal fuel stops along the route.
         
@@ -281,6 +718,7 @@ class FuelOptimizer:
             end_lon: End longitude
             initial_fuel_gallons: Initial fuel level at start (gallons)
             algorithm: Optimization algorithm to use ('greedy' or 'dijkstra')
+            total_distance_m: Route length reported by the routing API (meters), if known
         
         Returns:
             List of dicts with fuel station info and distance along route
@@ -291,21 +729,8 @@ class FuelOptimizer:
         # Convert fuel_stations to list if it's a QuerySet
         # Check if it's a QuerySet by checking for model attribute (QuerySets have model, lists don't)
         if hasattr(fuel_stations, 'model'):
-            # Convert QuerySet to list of dictionaries
-            fuel_stations_list = []
-            for station in fuel_stations:
-                if hasattr(station, 'latitude'):  # It's a FuelStation model instance
-                    fuel_stations_list.append({
-                        'id': station.id,
-                        'name': station.truckstop_name,
-                        'address': f"{station.address}, {station.city}, {station.state}",
-                        'lat': float(station.latitude),
-                        'lon': float(station.longitude),
-                        'price': float(station.retail_price),
-                    })
-                else:  # It's already a dict
-                    fuel_stations_list.append(station)
-            fuel_stations = fuel_stations_list
+            # One values_list() query with the price cast to float in SQL; no model instances or Decimals
+            fuel_stations = queryset_station_dicts(fuel_stations)
         
         if not fuel_stations:
             logger.warning("No fuel stations provided to find_optimal_stops")
@@ -324,19 +749,50 @@ class FuelOptimizer:
         if initial_fuel_gallons is None:
             initial_fuel_gallons = self.MAX_FUEL_CAPACITY_GALLONS
         
-        # Calculate total route distance
-        total_distance_km = self._calculate_route_distance(route_geometry, len(route_geometry) - 1)
-        total_distance_miles = total_distance_km / 1.60934
+        # Use the routing API's distance when available; only measure the geometry without it
+        geometry_distance_m = path_length_meters(route_geometry)
+        if total_distance_m is None:
+            total_distance_m = geometry_distance_m
+        total_distance_km = total_distance_m / 1000
+        total_distance_miles = total_distance_km * MILES_PER_KM
         logger.info("Total route distance: %.2f km (%.2f miles)", total_distance_km, total_distance_miles)
         
-        # Sort by distance along route (if distance_along_route_km is available)
-        if fuel_stations and 'distance_along_route_km' in fuel_stations[0]:
-            if fuel_stations:
-                logger.info("First route station: %s at %.2f km", 
-                           fuel_stations[0].get('name', 'unknown'), 
-                           fuel_stations[0].get('distance_along_route_km', 0))
-            fuel_stations.sort(key=lambda x: x.get('distance_along_route_km', 0))
-            logger.info("Sorted %d route stations by distance along route", len(fuel_stations))
+        # Locate stations that weren't pre-matched to the route with the same matcher the
+        # views use, with no distance threshold so every station gets placed
+        unplaced = [station for station in fuel_stations if 'distance_along_route_km' not in station]
+        if unplaced:
+            matches = self._match_route_points(
+                [(station['lon'], station['lat']) for station in unplaced], route_geometry, math.inf
+            )
+            for idx, along_km, from_km in matches:
+                unplaced[idx]['distance_along_route_km'] = along_km
+                unplaced[idx]['distance_from_route_km'] = from_km
+            logger.info("Computed route distances for %d stations", len(unplaced))
+        
+        # Station positions are haversine distances along the (simplified) geometry, which
+        # measures shorter than the API's road distance; put them on the same scale as the total
+        if geometry_distance_m > 0 and total_distance_m != geometry_distance_m:
+            scale = total_distance_m / geometry_distance_m
+            for station in fuel_stations:
+                if 'distance_along_route_km' in station:
+                    station['distance_along_route_km'] *= scale
+        
+        # Stations projected past the destination (float error at the far end) can't be
+        # useful stops and would break the ordering
+        fuel_stations = [
+            station for station in fuel_stations
+            if station.get('distance_along_route_km', 0) <= total_distance_km
+        ]
+        if not fuel_stations:
+            logger.warning("No fuel stations before the destination")
+            return []
+        
+        # Sort by distance along route
+        logger.info("First route station: %s at %.2f km", 
+                   fuel_stations[0].get('name', 'unknown'), 
+                   fuel_stations[0].get('distance_along_route_km', 0))
+        fuel_stations.sort(key=lambda x: x.get('distance_along_route_km', 0))
+        logger.info("Sorted %d route stations by distance along route", len(fuel_stations))
         
         # Use selected algorithm
         logger.info("Calling %s algorithm with %d fuel stops...", algorithm, len(fuel_stations))
@@ -352,7 +808,7 @@ class FuelOptimizer:
                 initial_fuel_gallons, fuel_stations, total_distance_miles
             )
         else:
-            logger.warning(f"Unknown algorithm: {algorithm}, using greedy")
+            logger.warning("Unknown algorithm: %s, using greedy", algorithm)
             return self.greedy_algorithm(
                 start_lat, start_lon, end_lat, end_lon,
                 initial_fuel_gallons, fuel_stations, total_distance_miles
@@ -387,151 +843,65 @@ class FuelOptimizer:
         
         logger.info("=" * 60)
         logger.info("Starting Greedy Algorithm")
-        logger.info(f"Start: ({start_lat:.6f}, {start_lon:.6f})")
-        logger.info(f"End: ({end_lat:.6f}, {end_lon:.6f})")
-        logger.info(f"Total distance: {total_distance_miles:.2f} miles")
-        logger.info(f"Initial fuel: {initial_fuel_gallons:.2f} gallons")
-        logger.info(f"Max fuel capacity: {self.MAX_FUEL_CAPACITY_GALLONS:.2f} gallons")
-        logger.info(f"Fuel efficiency: {self.FUEL_EFFICIENCY_MPG:.1f} miles/gallon")
-        logger.info(f"Total fuel stops available: {len(fuel_stops)}")
+        logger.info("Start: (%.6f, %.6f)", start_lat, start_lon)
+        logger.info("End: (%.6f, %.6f)", end_lat, end_lon)
+        logger.info("Total distance: %.2f miles", total_distance_miles)
+        logger.info("Initial fuel: %.2f gallons", initial_fuel_gallons)
+        logger.info("Max fuel capacity: %.2f gallons", self.MAX_FUEL_CAPACITY_GALLONS)
+        logger.info("Fuel efficiency: %.1f miles/gallon", self.FUEL_EFFICIENCY_MPG)
+        logger.info("Total fuel stops available: %d", len(fuel_stops))
         logger.info("=" * 60)
         
-        # Current state
-        current_fuel_gallons = initial_fuel_gallons
-        current_position_miles = 0.0  # Distance from start along route
-        optimal_stops = []
-        visited_stops = set()  # Track visited stops to avoid duplicates
-        iteration = 0
+        # Station positions and prices as arrays, ordered by distance along route, so
+        # each iteration finds its reachable window with two binary searches
+        stop_miles = np.fromiter(
+            (stop['distance_along_route_km'] * MILES_PER_KM for stop in fuel_stops),
+            dtype=np.float64, count=len(fuel_stops)
+        )
+        order = np.argsort(stop_miles, kind='stable')
+        stop_miles = stop_miles[order]
+        stop_prices = np.fromiter(
+            (fuel_stops[i]['price'] for i in order), dtype=np.float64, count=len(fuel_stops)
+        )
         
-        # Calculate distance to end
+        # The refueling loop runs over plain arrays; stop dicts are only built for the
+        # stops it picks
+        chosen, arrival_fuel, purchased, costs, current_position_miles, stranded = _greedy_core(
+            stop_miles, stop_prices, total_distance_miles, initial_fuel_gallons,
+            self.FUEL_EFFICIENCY_MPG, self.MAX_FUEL_CAPACITY_GALLONS,
+        )
         end_distance_miles = total_distance_miles
         
-        while current_position_miles < end_distance_miles:
-            iteration += 1
-            logger.info("-" * 60)
-            logger.info(f"Iteration {iteration}: Current position = {current_position_miles:.2f} miles")
-            logger.info(f"Current fuel: {current_fuel_gallons:.2f} gallons")
-            
-            # Calculate how far we can go with current fuel (in miles)
-            current_range_miles = current_fuel_gallons * self.FUEL_EFFICIENCY_MPG
-            logger.info(f"Current range: {current_range_miles:.2f} miles")
-            
-            # Check if we can reach the end with current fuel
-            remaining_distance_miles = end_distance_miles - current_position_miles
-            logger.info(f"Remaining distance to end: {remaining_distance_miles:.2f} miles")
-            
-            if remaining_distance_miles <= current_range_miles:
-                # We can reach the end, no need for more stops
-                logger.info("✓ Can reach end with current fuel. No more stops needed.")
-                break
-            
-            logger.info(f"Need to refuel. Searching for reachable fuel stops within {current_range_miles:.2f} miles...")
-            
-            # Find all reachable fuel stops from current position
-            reachable_stops = []
-            for stop in fuel_stops:
-                stop_distance_miles = stop['distance_along_route_km'] / 1.60934
-                distance_to_stop_miles = stop_distance_miles - current_position_miles
-                
-                # Check if stop is ahead of us and within range
-                if (distance_to_stop_miles > 0 and 
-                    distance_to_stop_miles <= current_range_miles and
-                    stop['id'] not in visited_stops):
-                    reachable_stops.append({
-                        **stop,
-                        'distance_to_stop_miles': distance_to_stop_miles
-                    })
-            
-            logger.info(f"Found {len(reachable_stops)} reachable fuel stop(s)")
-            
-            if not reachable_stops:
-                # No reachable stops - check if we can still reach end
-                if remaining_distance_miles > current_range_miles:
-                    logger.warning(f"⚠ Cannot reach end ({remaining_distance_miles:.2f} miles) or any fuel stop from current position")
-                    logger.warning(f"Current range is only {current_range_miles:.2f} miles")
-                    break
-                logger.info("No reachable stops, but can reach end")
-                break
-            
-            # Log all reachable stops
-            for stop in reachable_stops:
-                logger.info(f"  - {stop['name']}: {stop['distance_to_stop_miles']:.2f} miles away, "
-                           f"price: ${stop['price']:.4f}/gallon")
-            
-            # Pick the cheapest reachable stop
-            cheapest_stop = min(reachable_stops, key=lambda x: x['price'])
-            
-            logger.info(f"→ Selected cheapest stop: {cheapest_stop['name']}")
-            logger.info(f"  Distance: {cheapest_stop['distance_to_stop_miles']:.2f} miles")
-            logger.info(f"  Price: ${cheapest_stop['price']:.4f}/gallon")
-            
-            # Calculate fuel consumed to reach this stop
-            distance_to_stop_miles = cheapest_stop['distance_to_stop_miles']
-            fuel_consumed = distance_to_stop_miles / self.FUEL_EFFICIENCY_MPG
-            logger.info(f"  Fuel consumed to reach stop: {fuel_consumed:.2f} gallons")
-            
-            current_fuel_gallons -= fuel_consumed
-            fuel_capacity_at_arrival = current_fuel_gallons  # Fuel level when arriving at stop
-            logger.info(f"  Fuel remaining after travel: {current_fuel_gallons:.2f} gallons")
-            
-            # Update current position to this stop
-            stop_position_miles = cheapest_stop['distance_along_route_km'] / 1.60934
-            remaining_distance_to_end = end_distance_miles - stop_position_miles
-            
-            # Calculate minimum fuel needed to reach the end from this stop
-            min_fuel_needed_gallons = remaining_distance_to_end / self.FUEL_EFFICIENCY_MPG
-            
-            # Check if this is the last stop (we can reach end after refueling here)
-            # Only refuel enough to reach the end, not to max capacity
-            if remaining_distance_to_end <= (self.MAX_FUEL_CAPACITY_GALLONS * self.FUEL_EFFICIENCY_MPG):
-                # This is the last stop - only refuel enough to reach the end
-                fuel_needed = min_fuel_needed_gallons - current_fuel_gallons
-                
-                # If we already have enough fuel, add a small safety buffer
-                if fuel_needed <= 0:
-                    fuel_added = 0.1  # Small buffer for safety
-                    logger.info(f"  Already have enough fuel to reach end, adding safety buffer: +{fuel_added:.2f} gallons")
-                else:
-                    # Calculate how much to refuel, but don't exceed max capacity
-                    fuel_added = min(fuel_needed, self.MAX_FUEL_CAPACITY_GALLONS - current_fuel_gallons)
-                    # Add a small buffer (5% or 0.1 gallons, whichever is larger) for safety
-                    safety_buffer = max(0.1, fuel_added * 0.05)
-                    fuel_added += safety_buffer
-                    # Don't exceed max capacity
-                    fuel_added = min(fuel_added, self.MAX_FUEL_CAPACITY_GALLONS - current_fuel_gallons)
-                
-                current_fuel_gallons += fuel_added
-                fuel_cost_at_stop = fuel_added * cheapest_stop['price']
-                logger.info(f"  Last stop before end - refueled only what's needed: +{fuel_added:.2f} gallons → {current_fuel_gallons:.2f} gallons")
-                logger.info(f"  Remaining distance to end: {remaining_distance_to_end:.2f} miles (needs {min_fuel_needed_gallons:.2f} gallons)")
-            else:
-                # Not the last stop - refuel to max capacity
-                fuel_added = self.MAX_FUEL_CAPACITY_GALLONS - current_fuel_gallons
-                fuel_cost_at_stop = fuel_added * cheapest_stop['price']  # Cost for this refuel
-                current_fuel_gallons = self.MAX_FUEL_CAPACITY_GALLONS
-                logger.info(f"  Refueled to max capacity: +{fuel_added:.2f} gallons → {current_fuel_gallons:.2f} gallons")
-            
-            logger.info(f"  Fuel cost at this stop: ${fuel_cost_at_stop:.2f}")
-            
-            # Add fuel information to the stop before adding to optimal_stops
-            cheapest_stop['fuel_capacity_at_arrival'] = round(fuel_capacity_at_arrival, 2)
-            cheapest_stop['fuel_purchased_gallons'] = round(fuel_added, 2)
-            cheapest_stop['fuel_cost_at_stop'] = round(fuel_cost_at_stop, 2)
-            
-            # Add to optimal stops
-            optimal_stops.append(cheapest_stop)
-            visited_stops.add(cheapest_stop['id'])
-            
-            # Update current position (using already calculated stop_position_miles)
-            current_position_miles = stop_position_miles
-            logger.info(f"  New position: {current_position_miles:.2f} miles from start")
+        optimal_stops = []
+        previous_position_miles = 0.0
+        for idx, fuel_at_arrival, fuel_added, fuel_cost_at_stop in zip(chosen, arrival_fuel, purchased, costs):
+            stop_position_miles = float(stop_miles[idx])
+            stop = {
+                **fuel_stops[order[idx]],
+                'distance_to_stop_miles': stop_position_miles - previous_position_miles,
+                'fuel_capacity_at_arrival': round(fuel_at_arrival, 2),
+                'fuel_purchased_gallons': round(fuel_added, 2),
+                'fuel_cost_at_stop': round(fuel_cost_at_stop, 2),
+            }
+            logger.debug(
+                "Stop %d: %s at %.2f miles, price $%.4f/gallon, arrived with %.2f gallons, "
+                "bought %.2f gallons for $%.2f",
+                len(optimal_stops) + 1, stop['name'], stop_position_miles, stop['price'],
+                fuel_at_arrival, fuel_added, fuel_cost_at_stop,
+            )
+            optimal_stops.append(stop)
+            previous_position_miles = stop_position_miles
+        
+        if stranded:
+            logger.warning("⚠ Cannot reach end (%.2f miles) or any fuel stop from position %.2f miles",
+                           end_distance_miles - current_position_miles, current_position_miles)
         
         logger.info("=" * 60)
         logger.info("Greedy Algorithm Complete")
-        logger.info(f"Total stops selected: {len(optimal_stops)}")
-        logger.info(f"Final position: {current_position_miles:.2f} miles")
-        logger.info(f"Remaining distance to end: {end_distance_miles - current_position_miles:.2f} miles")
-        if optimal_stops:
+        logger.info("Total stops selected: %d", len(optimal_stops))
+        logger.info("Final position: %.2f miles", current_position_miles)
+        logger.info("Remaining distance to end: %.2f miles", end_distance_miles - current_position_miles)
+        if optimal_stops and logger.isEnabledFor(logging.INFO):
             # Calculate actual total cost and fuel purchased
             total_cost = sum(stop.get('fuel_cost_at_stop', 0) for stop in optimal_stops)
             total_fuel_purchased = sum(stop.get('fuel_purchased_gallons', 0) for stop in optimal_stops)
@@ -540,8 +910,8 @@ class FuelOptimizer:
             if total_cost == 0:
                 total_cost = sum(stop.get('fuel_purchased_gallons', 0) * stop.get('price', 0) for stop in optimal_stops)
             
-            logger.info(f"Total fuel purchased: {total_fuel_purchased:.2f} gallons")
-            logger.info(f"Total fuel cost: ${total_cost:.2f}")
+            logger.info("Total fuel purchased: %.2f gallons", total_fuel_purchased)
+            logger.info("Total fuel cost: $%.2f", total_cost)
         logger.info("=" * 60)
         
         return optimal_stops
@@ -554,8 +924,10 @@ class FuelOptimizer:
         """
         Dijkstra algorithm to find optimal fuel stops.
         
-        Uses Dijkstra's algorithm to find the minimum cost path by exploring
-        states of (station_index, fuel_in_tank) and choosing optimal fuel purchases.
+        Finds the minimum cost purchase plan. With a fixed price per station the
+        search over (station_index, fuel_in_tank) states reduces to a single pass:
+        buy just enough to reach the next cheaper station when it is within range,
+        otherwise fill the tank.
         
         Args:
             start_lat: Start latitude
@@ -575,507 +947,150 @@ class FuelOptimizer:
         
         logger.info("=" * 60)
         logger.info("Starting Dijkstra Algorithm")
-        logger.info(f"Start: ({start_lat:.6f}, {start_lon:.6f})")
-        logger.info(f"End: ({end_lat:.6f}, {end_lon:.6f})")
-        logger.info(f"Total distance: {total_distance_miles:.2f} miles")
-        logger.info(f"Initial fuel: {initial_fuel_gallons:.2f} gallons")
-        logger.info(f"Max fuel capacity: {self.MAX_FUEL_CAPACITY_GALLONS:.2f} gallons")
-        logger.info(f"Fuel efficiency: {self.FUEL_EFFICIENCY_MPG:.1f} miles/gallon")
-        logger.info(f"Total fuel stops available: {len(fuel_stops)}")
+        logger.info("Start: (%.6f, %.6f)", start_lat, start_lon)
+        logger.info("End: (%.6f, %.6f)", end_lat, end_lon)
+        logger.info("Total distance: %.2f miles", total_distance_miles)
+        logger.info("Initial fuel: %.2f gallons", initial_fuel_gallons)
+        logger.info("Max fuel capacity: %.2f gallons", self.MAX_FUEL_CAPACITY_GALLONS)
+        logger.info("Fuel efficiency: %.1f miles/gallon", self.FUEL_EFFICIENCY_MPG)
+        logger.info("Total fuel stops available: %d", len(fuel_stops))
         logger.info("=" * 60)
         
-        # Convert fuel stops to miles and prepare stations list
-        # Add start position as station 0 (distance 0, cannot buy fuel here)
-        stations = [{
-            'distance': 0.0,
-            'price': float('inf'),  # Cannot buy fuel at start
-            'original_stop': None
-        }]
-        
-        # Add actual fuel stops
-        for stop in fuel_stops:
-            distance_miles = stop['distance_along_route_km'] / 1.60934
-            stations.append({
-                'distance': distance_miles,
-                'price': stop['price'],
-                'original_stop': stop  # Keep reference to original stop data
-            })
-        
-        # Add destination as last "station" with infinite price
-        stations.append({
-            'distance': total_distance_miles,
-            'price': float('inf'),
-            'original_stop': None
-        })
-        
-        n = len(stations)
+        # Stations as parallel arrays: start position as station 0 and the destination as
+        # the last station, both with infinite price (cannot buy fuel there)
+        n = len(fuel_stops) + 2
+        distance_array = np.empty(n, dtype=np.float64)
+        distance_array[0] = 0.0
+        distance_array[1:-1] = np.fromiter(
+            (stop['distance_along_route_km'] for stop in fuel_stops),
+            dtype=np.float64, count=len(fuel_stops)
+        ) * MILES_PER_KM
+        distance_array[-1] = total_distance_miles
+        price_array = np.full(n, np.inf)
+        price_array[1:-1] = np.fromiter(
+            (stop['price'] for stop in fuel_stops), dtype=np.float64, count=len(fuel_stops)
+        )
+        # Keep references to the original stop data
+        original_stops = [None, *fuel_stops, None]
+        # Plain lists for the scalar lookups in the search loop below
+        distances = distance_array.tolist()
+        prices = price_array.tolist()
         mpg = self.FUEL_EFFICIENCY_MPG
-        fuel_step = 0.02
-
-        def gallons_to_steps(gallons: float, round_up: bool = False) -> int:
-            scaled = gallons / fuel_step
-            if round_up:
-                return int(math.ceil(scaled - 1e-9))
-            return int(round(scaled))
-
-        def steps_to_gallons(steps: int) -> float:
-            return steps * fuel_step
-
         tank_capacity_gallons = self.MAX_FUEL_CAPACITY_GALLONS
-        tank_capacity_steps = gallons_to_steps(tank_capacity_gallons)
-        initial_fuel_steps = min(
-            gallons_to_steps(min(initial_fuel_gallons, tank_capacity_gallons)),
-            tank_capacity_steps,
-        )
         max_range_miles = tank_capacity_gallons * mpg
         
         # Ensure route is monotonically increasing in distance and reachable
-        for idx in range(1, n):
-            segment = stations[idx]['distance'] - stations[idx - 1]['distance']
-            if segment < -1e-6:
+        segments = np.diff(distance_array)
+        bad_order = segments < -RANGE_TOLERANCE_MILES
+        too_far = segments - RANGE_TOLERANCE_MILES > max_range_miles
+        problems = np.flatnonzero(bad_order | too_far)
+        if problems.size:
+            # Report the first problem along the route
+            if bad_order[problems[0]]:
                 logger.warning("Route stations are not sorted by distance")
-                return []
-            if segment - 1e-6 > max_range_miles:
+            else:
                 logger.warning(
                     "Gap between stations exceeds maximum driving range; route unreachable"
                 )
-                return []
-        
-        # Sliding window: furthest station reachable from each station
-        reachable_end = [i for i in range(n)]
-        right = 0
-        for i in range(n):
-            if right < i:
-                right = i
-            while (
-                right + 1 < n
-                and stations[right + 1]['distance'] - stations[i]['distance']
-                <= max_range_miles + 1e-6
-            ):
-                right += 1
-            reachable_end[i] = right
+            return []
         
-        # Next cheaper station using monotonic stack
-        next_cheaper = [-1] * n
+        # Next cheaper station using monotonic stack; the destination needs no fuel,
+        # so it stands in as the cheaper station when nothing ahead is cheaper
+        next_cheaper = [n - 1] * n
         price_stack = []
         for idx in range(n - 1, -1, -1):
-            price = stations[idx]['price']
-            while price_stack and price <= stations[price_stack[-1]]['price']:
+            price = prices[idx]
+            while price_stack and price <= prices[price_stack[-1]]:
                 price_stack.pop()
-            next_cheaper[idx] = price_stack[-1] if price_stack else -1
+            if price_stack:
+                next_cheaper[idx] = price_stack[-1]
             if price < float('inf'):
                 price_stack.append(idx)
         
-        # Sparse edges limited to reachable / useful stations
-        edges = [[] for _ in range(n)]
-        edge_lookup = {}
-        
-        def register_edge(src_idx: int, dst_idx: int):
-            if dst_idx <= src_idx:
-                return
-            dist = stations[dst_idx]['distance'] - stations[src_idx]['distance']
-            if dist < -1e-6 or dist > max_range_miles + 1e-6:
-                return
-            gallons = dist / mpg
-            if gallons > tank_capacity_gallons + 1e-6:
-                return
-            needed_steps = gallons_to_steps(gallons, round_up=True)
-            edges[src_idx].append((dst_idx, needed_steps))
-            edge_lookup[(src_idx, dst_idx)] = needed_steps
-        
-        for i in range(n - 1):
-            max_idx = reachable_end[i]
-            if max_idx <= i:
-                continue
-            candidates = set()
-            if i + 1 <= max_idx:
-                candidates.add(i + 1)
-            cheaper_idx = next_cheaper[i]
-            if cheaper_idx != -1 and cheaper_idx <= max_idx:
-                candidates.add(cheaper_idx)
-            candidates.add(max_idx)
-            if reachable_end[i] >= n - 1:
-                candidates.add(n - 1)
-            for candidate in candidates:
-                register_edge(i, candidate)
-        
+        # Prices are fixed per station, so the cheapest plan is greedy: at each station buy
+        # just enough to reach the next cheaper station if it is within range, otherwise
+        # this is the cheapest fuel in range and the tank is filled
+        fuel = min(initial_fuel_gallons, tank_capacity_gallons)
+        optimal_stops = []
+        total_cost = 0.0
         for i in range(n - 1):
-            if not edges[i]:
-                logger.warning(
-                    f"No reachable stations from index {i}; cannot complete route"
-                )
-                return []
-
-        def get_fuel_needed_steps(src_idx: int, dst_idx: int) -> int:
-            if src_idx == dst_idx:
-                return 0
-            if (src_idx, dst_idx) in edge_lookup:
-                return edge_lookup[(src_idx, dst_idx)]
-            dist = stations[dst_idx]['distance'] - stations[src_idx]['distance']
-            gallons = dist / mpg
-            needed_steps = gallons_to_steps(gallons, round_up=True)
-            edge_lookup[(src_idx, dst_idx)] = needed_steps
-            return needed_steps
-        
-        # Dijkstra state: (cost, station_index, fuel_in_tank)
-        pq = []
-        heapq.heappush(pq, (0.0, 0, initial_fuel_steps))
-        
-        # best cost seen for (station_index, fuel_in_tank)
-        best = [[float('inf')] * (tank_capacity_steps + 1) for _ in range(n)]
-        best[0][initial_fuel_steps] = 0.0
-        
-        # for reconstruction: parent[(station_index, fuel)] = (prev_station_index, prev_fuel, fuel_purchased)
-        parent = {(0, initial_fuel_steps): None}
-        while pq:
-            cost, i, f = heapq.heappop(pq)
-            
-            if cost != best[i][f]:
-                continue
-            
-            # If at destination, reconstruct path
-            if i == n - 1:
-                # Reconstruct path
-                plan = []
-                cur = (i, f)
-                while cur:
-                    plan.append(cur)
-                    cur = parent.get(cur)
-                plan.reverse()
-                
-                # Convert path to fuel stops format
-                optimal_stops = []
-                total_cost = cost
-                
-                # Process the path to extract fuel purchases
-                # Track stations we've visited and their purchase info
-                station_info = {}  # station_idx -> {'arrival_fuel': float, 'fuel_purchased': float, 'original_stop': dict}
-                
-                for idx in range(len(plan) - 1):  # -1 to skip destination
-                    curr_station, curr_fuel = plan[idx]
-                    next_station, next_fuel = plan[idx + 1]
-                    
-                    # Skip start position (station 0) and destination (station n-1)
-                    if curr_station == 0 or curr_station == n - 1:
-                        # But track arrival at next station if we're driving
-                        if curr_station == 0 and next_station != n - 1:
-                            fuel_consumed = get_fuel_needed_steps(curr_station, next_station)
-                            fuel_at_arrival = curr_fuel - fuel_consumed
-                            if next_station not in station_info:
-                                original_stop = stations[next_station]['original_stop']
-                                if original_stop:
-                                    station_info[next_station] = {
-                                        'arrival_fuel': steps_to_gallons(fuel_at_arrival),
-                                        'fuel_purchased': 0.0,
-                                        'original_stop': original_stop
-                                    }
-                        continue
-                    
-                    # Get the original stop
-                    original_stop = stations[curr_station]['original_stop']
-                    if original_stop is None:
-                        continue
-                    
-                    if curr_station == next_station:
-                        # Same station, fuel increased = fuel purchase
-                        if curr_station not in station_info:
-                            # First time at this station in this iteration
-                            station_info[curr_station] = {
-                                'arrival_fuel': steps_to_gallons(curr_fuel),
-                                'fuel_purchased': 0.0,
-                                'original_stop': original_stop
-                            }
-                        
-                        fuel_bought_steps = next_fuel - curr_fuel
-                        if fuel_bought_steps > 0:
-                            station_info[curr_station]['fuel_purchased'] += steps_to_gallons(fuel_bought_steps)
-                    else:
-                        # Drove to a different station
-                        # First, finalize current station if we made purchases
-                        if curr_station in station_info and station_info[curr_station]['fuel_purchased'] > 0:
-                            info = station_info[curr_station]
-                            fuel_cost = info['fuel_purchased'] * stations[curr_station]['price']
-                            info['original_stop']['fuel_capacity_at_arrival'] = round(info['arrival_fuel'], 2)
-                            info['original_stop']['fuel_purchased_gallons'] = round(info['fuel_purchased'], 2)
-                            info['original_stop']['fuel_cost_at_stop'] = round(fuel_cost, 2)
-                            optimal_stops.append(info['original_stop'])
-                            del station_info[curr_station]
-                        
-                        # Track arrival at next station
-                        if next_station != n - 1:  # Not destination
-                            fuel_consumed = get_fuel_needed_steps(curr_station, next_station)
-                            fuel_at_arrival = curr_fuel - fuel_consumed
-                            if next_station not in station_info:
-                                next_original_stop = stations[next_station]['original_stop']
-                                if next_original_stop:
-                                    station_info[next_station] = {
-                                        'arrival_fuel': steps_to_gallons(fuel_at_arrival),
-                                        'fuel_purchased': 0.0,
-                                        'original_stop': next_original_stop
-                                    }
-                
-                # Handle any remaining stations (e.g., last station before destination)
-                for station_idx, info in station_info.items():
-                    if info['fuel_purchased'] > 0:
-                        fuel_cost = info['fuel_purchased'] * stations[station_idx]['price']
-                        info['original_stop']['fuel_capacity_at_arrival'] = round(info['arrival_fuel'], 2)
-                        info['original_stop']['fuel_purchased_gallons'] = round(info['fuel_purchased'], 2)
-                        info['original_stop']['fuel_cost_at_stop'] = round(fuel_cost, 2)
-                        optimal_stops.append(info['original_stop'])
-                
-                logger.info("=" * 60)
-                logger.info("Dijkstra Algorithm Complete")
-                logger.info(f"Total stops selected: {len(optimal_stops)}")
-                logger.info(f"Total cost: ${total_cost:.2f}")
-                if optimal_stops:
-                    total_fuel_purchased = sum(stop.get('fuel_purchased_gallons', 0) for stop in optimal_stops)
-                    logger.info(f"Total fuel purchased: {total_fuel_purchased:.2f} gallons")
-                logger.info("=" * 60)
-                
-                return optimal_stops
-            
-            # Option 1: BUY FUEL (if tank not full)
-            if f < tank_capacity_steps:
-                next_f = f + 1
-                next_cost = cost + stations[i]['price'] * fuel_step
-                
-                if next_cost < best[i][next_f]:
-                    best[i][next_f] = next_cost
-                    heapq.heappush(pq, (next_cost, i, next_f))
-                    parent[(i, next_f)] = (i, f)
-            
-            # Option 2: DRIVE TO RELEVANT NEXT STATIONS
-            for j, needed in edges[i]:
-                if needed <= f:  # fuel is enough
-                    next_f = int(f - needed)
-                    next_cost = cost
-                    
-                    if next_cost < best[j][next_f]:
-                        best[j][next_f] = next_cost
-                        heapq.heappush(pq, (next_cost, j, next_f))
-                        parent[(j, next_f)] = (i, f)
-        
-        logger.warning("Dijkstra algorithm: Could not reach destination")
-        return []
-    
-    def _point_to_segment_distance(self, px: float, py: float,
-                                    x1: float, y1: float, x2: float, y2: float) -> float:
-        """Calculate distance from point to line segment using geodesic distance"""
-        # Convert to (lat, lon) tuples for geopy
-        A = (y1, x1)  # (lat, lon)
-        B = (y2, x2)  # (lat, lon)
-        P = (py, px)  # (lat, lon)
-        
-        # If segment is a point, return distance to that point
-        if x1 == x2 and y1 == y2:
-            return geodesic(P, A).kilometers
-        
-        # Calculate distances to endpoints first (cheapest check)
-        dist_to_A = geodesic(P, A).kilometers
-        dist_to_B = geodesic(P, B).kilometers
-        min_dist = min(dist_to_A, dist_to_B)
-        
-        # Early exit if already very close (optimization)
-        if min_dist < 0.1:  # Within 100m
-            return min_dist
-        
-        # Segment length
-        segment_length = geodesic(A, B).kilometers
-        if segment_length == 0:
-            return dist_to_A
-        
-        # For longer segments, sample fewer points to reduce geodesic calls
-        # Use adaptive sampling based on segment length
-        if segment_length < 1.0:  # Short segment (< 1km)
-            num_samples = 3
-        elif segment_length < 5.0:  # Medium segment (< 5km)
-            num_samples = 5
-        else:  # Long segment
-            num_samples = 7
-        
-        # Sample points along the segment
-        for i in range(1, num_samples):  # Skip endpoints (already checked)
-            ratio = i / num_samples
-            # Interpolate point along segment
-            sample_lat = y1 + (y2 - y1) * ratio
-            sample_lon = x1 + (x2 - x1) * ratio
-            sample_point = (sample_lat, sample_lon)
-            
-            dist = geodesic(P, sample_point).kilometers
-            min_dist = min(min_dist, dist)
+            if i > 0:
+                to_cheaper = distances[next_cheaper[i]] - distances[i]
+                if to_cheaper <= max_range_miles + RANGE_TOLERANCE_MILES:
+                    fuel_to_buy = to_cheaper / mpg - fuel
+                else:
+                    fuel_to_buy = tank_capacity_gallons - fuel
+                if fuel_to_buy > 1e-9:
+                    fuel_cost = fuel_to_buy * prices[i]
+                    stop = original_stops[i]
+                    stop['fuel_capacity_at_arrival'] = round(max(fuel, 0.0), 2)
+                    stop['fuel_purchased_gallons'] = round(fuel_to_buy, 2)
+                    stop['fuel_cost_at_stop'] = round(fuel_cost, 2)
+                    optimal_stops.append(stop)
+                    total_cost += fuel_cost
+                    fuel += fuel_to_buy
             
-            # Early exit if we found a very close point
-            if min_dist < 0.1:
-                break
-        
-        return min_dist
-    
-    def _calculate_route_distance(self, route_geometry: List[List[float]], 
-                                  end_idx: int) -> float:
-        """Calculate cumulative distance along route up to end_idx"""
-        total_km = 0
-        for i in range(end_idx):
-            if i + 1 < len(route_geometry):
-                point1 = (route_geometry[i][1], route_geometry[i][0])  # (lat, lon)
-                point2 = (route_geometry[i+1][1], route_geometry[i+1][0])
-                total_km += geodesic(point1, point2).kilometers
-        return total_km
-    
-    def _fast_point_to_segment_distance_km(self, px: float, py: float,
-                                           x1: float, y1: float, x2: float, y2: float) -> float:
-        """
-        Fast planar distance calculation (much faster than geodesic).
-        Uses equirectangular projection approximation.
-        Returns distance in kilometers.
-        """
-        # Convert lat/lon to approximate km using equirectangular projection
-        lat_rad = math.radians(py)
-        lat_scale = 111.0  # km per degree latitude
-        lon_scale = 111.0 * math.cos(lat_rad)  # km per degree longitude at this latitude
-        
-        # Convert points to km space
-        Px = (px - x1) * lon_scale
-        Py = (py - y1) * lat_scale
-        Ax = 0.0
-        Ay = 0.0
-        Bx = (x2 - x1) * lon_scale
-        By = (y2 - y1) * lat_scale
-        
-        # Vector from A to B
-        ABx = Bx - Ax
-        ABy = By - Ay
-        
-        # Segment length squared
-        seg_len_sq = ABx * ABx + ABy * ABy
-        
-        if seg_len_sq == 0.0:
-            # Segment is a point
-            return math.sqrt(Px * Px + Py * Py)
+            # Drive on to the next station
+            fuel -= (distances[i + 1] - distances[i]) / mpg
+            if fuel < -RANGE_TOLERANCE_MILES / mpg:
+                logger.warning("Dijkstra algorithm: Could not reach destination")
+                return []
         
-        # Project P onto segment AB
-        dot = Px * ABx + Py * ABy
-        t = dot / seg_len_sq
+        logger.info("=" * 60)
+        logger.info("Dijkstra Algorithm Complete")
+        logger.info("Total stops selected: %d", len(optimal_stops))
+        logger.info("Total cost: $%.2f", total_cost)
+        if optimal_stops and logger.isEnabledFor(logging.INFO):
+            total_fuel_purchased = sum(stop.get('fuel_purchased_gallons', 0) for stop in optimal_stops)
+            logger.info("Total fuel purchased: %.2f gallons", total_fuel_purchased)
+        logger.info("=" * 60)
         
-        if t <= 0.0:
-            # Closest to A
-            return math.sqrt(Px * Px + Py * Py)
-        elif t >= 1.0:
-            # Closest to B
-            Cx = Px - Bx
-            Cy = Py - By
-            return math.sqrt(Cx * Cx + Cy * Cy)
-        else:
-            # Closest point is interior to the segment
-            Cx = Px - (Ax + t * ABx)
-            Cy = Py - (Ay + t * ABy)
-            return math.sqrt(Cx * Cx + Cy * Cy)
+        return optimal_stops
     
-    def process_station_with_threshold(self, station: Dict, route_geometry: List[List[float]], 
-                                       max_distance_km: float = 5.0) -> Optional[Dict]:
+    def batch_filter_station_rows(self, rows: List[Tuple], route_geometry: List[List[float]],
+                                  max_distance_km: float = 5.0) -> List[Dict]:
         """
-        Process a single station to find its distance from the route.
-        Returns the station dict with distance info if within threshold, None otherwise.
-        Uses fast planar calculations for speed.
+        Stations from row tuples (see queryset_station_rows) within max_distance_km of
+        the route, in input order, with 'distance_from_route_km' and
+        'distance_along_route_km' added.
         
-        Args:
-            station: Dict with 'lat', 'lon', and other station info
-            route_geometry: List of [lon, lat] coordinates along the route
-            max_distance_km: Maximum distance from route in km (default: 5.0)
-        
-        Returns:
-            Station dict with added 'distance_from_route_km' and 'distance_along_route_km',
-            or None if station is too far from route
+        Only the coordinates of every row are read; optimizer dicts are built just for
+        the stations within the threshold.
         """
-        if not route_geometry or len(route_geometry) < 2:
-            return None
-        
-        station_lat = station['lat']
-        station_lon = station['lon']
-        
-        # Fast bounding box check first - eliminate obviously far stations
-        route_lats = [pt[1] for pt in route_geometry]
-        route_lons = [pt[0] for pt in route_geometry]
-        min_lat, max_lat = min(route_lats), max(route_lats)
-        min_lon, max_lon = min(route_lons), max(route_lons)
-        
-        # Expand bounding box by max_distance_km (rough approximation in degrees)
-        # ~111 km per degree latitude, ~111*cos(lat) km per degree longitude
-        avg_lat = (min_lat + max_lat) / 2
-        lat_deg_threshold = max_distance_km / 111.0
-        lon_deg_threshold = max_distance_km / (111.0 * math.cos(math.radians(avg_lat)))
-        
-        if (station_lat < min_lat - lat_deg_threshold or 
-            station_lat > max_lat + lat_deg_threshold or
-            station_lon < min_lon - lon_deg_threshold or
-            station_lon > max_lon + lon_deg_threshold):
-            # Station is definitely too far
-            return None
-        
-        # Find closest point on route using fast planar calculations
-        min_dist = float('inf')
-        closest_idx = 0
-        
-        # Adaptive sampling based on route length
-        # For optimized_geometry (typically 300-500 points), check all segments
-        num_segments = len(route_geometry) - 1
-        if num_segments > 1000:
-            # For very long routes, sample more aggressively
-            step = max(1, num_segments // 1000)  # Sample ~1000 segments max
-        elif num_segments > 500:
-            step = max(1, num_segments // 500)  # Sample ~500 segments
-        else:
-            step = 1  # Check all segments for shorter/optimized routes
-        
-        logger.debug("process_station_with_threshold: Checking station %s against %d segments (step=%d)", 
-                    station.get('name', 'unknown'), num_segments, step)
-        
-        for i in range(0, num_segments, step):
-            if i + 1 >= len(route_geometry):
-                break
-            
-            # Fast planar distance calculation
-            dist = self._fast_point_to_segment_distance_km(
-                station_lon, station_lat,
-                route_geometry[i][0], route_geometry[i][1],
-                route_geometry[i+1][0], route_geometry[i+1][1]
-            )
-            
-            if dist < min_dist:
-                min_dist = dist
-                closest_idx = i
-            
-            # Early exit if we found a very close station (optimization)
-            if min_dist < 0.05:  # Within 50m, good enough
-                break
-        
-        # Only include stations within threshold (check after examining all segments)
-        if min_dist > max_distance_km:
-            logger.debug("process_station_with_threshold: Station %s is too far (%.2f km > %.2f km)", 
-                        station.get('name', 'unknown'), min_dist, max_distance_km)
-            return None
-        
-        # Calculate distance along route to this point
-        route_distance = self._calculate_route_distance(route_geometry, closest_idx)
-        
-        logger.debug("process_station_with_threshold: Station %s is within threshold (%.2f km <= %.2f km)", 
-                    station.get('name', 'unknown'), min_dist, max_distance_km)
+        if not rows or not route_geometry or len(route_geometry) < 2:
+            return []
         
-        # Return station with distance info
-        return {
-            **station,
-            'distance_along_route_km': route_distance,
-            'distance_from_route_km': min_dist,
-        }
+        points = [(row[_ROW_LON], row[_ROW_LAT]) for row in rows]
+        matches = self._match_route_points(points, route_geometry, max_distance_km)
+        stations = station_row_dicts(rows[idx] for idx, _, _ in matches)
+        for station, (_, along_km, from_km) in zip(stations, matches):
+            station['distance_along_route_km'] = along_km
+            station['distance_from_route_km'] = from_km
+        return stations
     
-    def _find_best_station_in_range(self, stations: List[Dict], 
-                                    start_distance: float, 
-                                    max_range: float) -> Optional[Dict]:
-        """Find the cheapest station within range"""
-        candidates = [
-            s for s in stations
-            if start_distance <= s['distance_along_route_km'] <= start_distance + max_range
-        ]
-        if not candidates:
-            return None
-        return min(candidates, key=lambda x: x['price'])
-
+    def _match_route_points(self, points: List[Tuple[float, float]], route_geometry: List[List[float]],
+                            max_distance_km: float) -> List[Tuple[int, float, float]]:
+        """(index, distance_along_route_km, distance_from_route_km) of the (lon, lat) points within the threshold"""
+        route = np.asarray(route_geometry, dtype=np.float64)
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        
+        # Same expanded bounding box the views query the database with
+        min_lat, max_lat, min_lon, max_lon = route_bounding_box(route, max_distance_km)
+        in_bbox = np.flatnonzero(
+            (points[:, 1] >= min_lat) & (points[:, 1] <= max_lat) &
+            (points[:, 0] >= min_lon) & (points[:, 0] <= max_lon)
+        )
+        if not in_bbox.size:
+            return []
+        
+        # Nearest segment for every remaining station, then the route distance to the closest point on it
+        distances_from_route, segment_indices, fractions = nearest_route_segments(points[in_bbox], route)
+        close = distances_from_route <= max_distance_km
+        distances_along_route = route_distance_at(
+            route_cumulative_km(route), segment_indices[close], fractions[close]
+        )
+        return list(zip(
+            in_bbox[close].tolist(),
+            distances_along_route.tolist(),
+            distances_from_route[close].tolist(),
+        ))
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FuelStation
+from .services import invalidate_station_table_version
+
+
+@receiver(post_save, sender=FuelStation)
+@receiver(post_delete, sender=FuelStation)
+def fuel_station_changed(sender, **kwargs):
+    """Drop the cached station table version behind the route ETag and Last-Modified"""
+    invalidate_station_table_version()
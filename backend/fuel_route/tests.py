@@ -1,3 +1,415 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.http import http_date
+from geopy.geocoders import Nominatim
+from geopy.location import Location
+
+from .management.commands.load_fuel_stations import Command as LoadFuelStationsCommand, address_key
+from .models import FuelStation, GeocodeCache
+from .serializers import RouteOptimizeSerializer, RoutePlanSerializer
+from .views import _not_modified, _route_validators
+from .services import (
+    FuelOptimizer, GeocodingService, KM_PER_MILE, MILES_PER_KM, RoutingService, path_length_meters,
+)
+
+
+def _stops(stations):
+    """Optimizer stop dicts from (miles along route, price) pairs"""
+    return [
+        {'id': idx, 'name': f'S{idx}', 'price': price, 'distance_along_route_km': miles * KM_PER_MILE}
+        for idx, (miles, price) in enumerate(stations)
+    ]
+
+
+def _brute_force_cost(stations, total_miles, initial_fuel, capacity, mpg, step):
+    """
+    Cheapest plan cost by trying every purchase of whole `step` gallons at every station,
+    or None when the destination can't be reached.
+
+    With distances and initial fuel in multiples of step * mpg miles, some optimal plan
+    buys whole steps only, so this search finds the true optimum.
+    """
+    points = [*stations, (total_miles, None)]
+    best = None
+
+    def search(idx, position, fuel, cost):
+        nonlocal best
+        miles, price = points[idx]
+        fuel -= (miles - position) / mpg
+        if fuel < -1e-9:
+            return
+        if price is None:
+            best = cost if best is None else min(best, cost)
+            return
+        bought = 0
+        while fuel + bought * step <= capacity + 1e-9:
+            search(idx + 1, miles, fuel + bought * step, cost + bought * step * price)
+            bought += 1
+
+    search(0, 0.0, initial_fuel, 0.0)
+    return best
+
+
+def _plan_cost(plan, total_miles, initial_fuel, capacity, mpg):
+    """Cost of following a returned plan, or None if it runs dry or overfills the tank"""
+    # Purchases are reported rounded to 0.01 gallons
+    slack = 0.011
+    fuel, position, cost = initial_fuel, 0.0, 0.0
+    for stop in plan:
+        miles = stop['distance_along_route_km'] / KM_PER_MILE
+        fuel -= (miles - position) / mpg
+        position = miles
+        if fuel < -slack:
+            return None
+        fuel += stop['fuel_purchased_gallons']
+        cost += stop['fuel_purchased_gallons'] * stop['price']
+        if fuel > capacity + slack:
+            return None
+    fuel -= (total_miles - position) / mpg
+    return cost if fuel >= -slack else None
+
+
+class FuelPlanAlgorithmTests(SimpleTestCase):
+    """dijkstra_algorithm must find the optimum; greedy_algorithm a feasible plan"""
+
+    MPG = 10.0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+        super().tearDownClass()
+
+    def plan(self, algorithm, stations, total_miles, initial_fuel, capacity):
+        optimizer = FuelOptimizer()
+        optimizer.MAX_FUEL_CAPACITY_GALLONS = capacity
+        optimizer.FUEL_EFFICIENCY_MPG = self.MPG
+        return getattr(optimizer, f'{algorithm}_algorithm')(
+            0.0, 0.0, 0.0, 0.0, initial_fuel, _stops(stations), total_miles
+        )
+
+    def check_against_brute_force(self, stations, total_miles, initial_fuel, capacity, step):
+        expected = _brute_force_cost(stations, total_miles, initial_fuel, capacity, self.MPG, step)
+        case = (stations, total_miles, initial_fuel, capacity)
+
+        dijkstra_plan = self.plan('dijkstra', stations, total_miles, initial_fuel, capacity)
+        dijkstra_cost = _plan_cost(dijkstra_plan, total_miles, initial_fuel, capacity, self.MPG)
+        greedy_plan = self.plan('greedy', stations, total_miles, initial_fuel, capacity)
+        greedy_cost = _plan_cost(greedy_plan, total_miles, initial_fuel, capacity, self.MPG)
+
+        if expected is None:
+            self.assertEqual(dijkstra_plan, [], case)
+            self.assertIsNone(greedy_cost, case)
+        else:
+            self.assertIsNotNone(dijkstra_cost, case)
+            self.assertAlmostEqual(dijkstra_cost, expected, delta=0.02, msg=case)
+            self.assertIsNotNone(greedy_cost, case)
+            self.assertGreaterEqual(greedy_cost, expected - 0.02, case)
+
+    def test_fixed_routes_match_brute_force(self):
+        cases = [
+            # stations (miles, price), total miles, initial gallons, capacity gallons
+            ([(10, 3.5), (25, 3.0), (40, 4.0)], 60, 2.0, 3.0),
+            ([(10, 3.0), (20, 3.5), (30, 3.0)], 55, 1.5, 2.5),
+            ([(5, 4.0), (15, 3.0), (35, 3.5), (45, 2.5)], 65, 1.0, 2.0),
+            ([(12, 3.2), (18, 3.1), (29, 3.3)], 40, 1.3, 2.0),
+            ([(6, 3.0)], 20, 2.0, 2.0),       # destination within the initial range
+            ([(10, 3.0), (20, 3.0)], 35, 1.0, 2.0),  # equal prices
+        ]
+        for stations, total_miles, initial_fuel, capacity in cases:
+            self.check_against_brute_force(stations, total_miles, initial_fuel, capacity, step=0.1)
+
+    def test_random_routes_match_brute_force(self):
+        rng = random.Random(0)
+        for _ in range(150):
+            total_miles = 5 * rng.randint(4, 24)
+            positions = rng.sample(range(1, total_miles // 5), min(rng.randint(1, 4), total_miles // 5 - 1))
+            stations = [(5 * position, rng.choice([3.0, 3.25, 3.5, 4.0])) for position in sorted(positions)]
+            initial_fuel = 0.5 * rng.randint(0, 8)
+            self.check_against_brute_force(stations, total_miles, initial_fuel, 4.0, step=0.5)
+
+    def test_no_station_reachable(self):
+        # 1 gallon covers 10 miles; the first station is 20 miles out
+        stations = [(20, 3.0), (35, 3.0)]
+        self.assertIsNone(_brute_force_cost(stations, 50, 1.0, 2.0, self.MPG, 0.1))
+        self.assertEqual(self.plan('dijkstra', stations, 50, 1.0, 2.0), [])
+        self.assertEqual(self.plan('greedy', stations, 50, 1.0, 2.0), [])
+
+        # Reachable first stop, but a 30 mile gap after it with a 20 mile tank
+        stations = [(10, 3.0), (40, 3.0)]
+        self.assertEqual(self.plan('dijkstra', stations, 50, 2.0, 2.0), [])
+        greedy_plan = self.plan('greedy', stations, 50, 2.0, 2.0)
+        self.assertIsNone(_plan_cost(greedy_plan, 50, 2.0, 2.0, self.MPG))
+
+    def test_partial_initial_fuel(self):
+        # 15 miles of fuel in a 40 mile tank: buy just enough at the pricey first station
+        # to reach the cheap one, then what's left of the trip there
+        stations = [(10, 4.0), (30, 3.0)]
+        plan = self.plan('dijkstra', stations, 60, 1.5, 4.0)
+        self.assertEqual([stop['id'] for stop in plan], [0, 1])
+        self.assertEqual([stop['fuel_capacity_at_arrival'] for stop in plan], [0.5, 0.0])
+        self.assertEqual([stop['fuel_purchased_gallons'] for stop in plan], [1.5, 3.0])
+        self.assertAlmostEqual(sum(stop['fuel_cost_at_stop'] for stop in plan), 15.0)
+
+        self.check_against_brute_force(stations, 60, 1.5, 4.0, step=0.1)
+
+    def test_station_exactly_at_range_limit(self):
+        # 43 miles doesn't survive the miles -> km -> miles round trip exactly
+        self.assertNotEqual(43 * KM_PER_MILE * MILES_PER_KM, 43)
+        stations = [(43, 3.0)]
+        for algorithm in ('dijkstra', 'greedy'):
+            plan = self.plan(algorithm, stations, 80, 4.3, 4.3)
+            self.assertEqual([stop['id'] for stop in plan], [0], algorithm)
+            self.assertEqual(plan[0]['fuel_capacity_at_arrival'], 0.0, algorithm)
+        self.check_against_brute_force(stations, 80, 4.3, 4.3, step=0.1)
+
+
+    def test_station_positions_use_the_api_distance_scale(self):
+        # The routing API reports a road distance 20% longer than the geometry measures
+        geometry = [[-97.0, 35.0], [-97.0, 36.0]]
+        geometry_m = path_length_meters(geometry)
+        station = {'id': 0, 'name': 'MID', 'address': '', 'lat': 35.5, 'lon': -97.0, 'price': 3.0}
+        FuelOptimizer().find_optimal_stops(
+            geometry, [station], initial_fuel_gallons=0, algorithm='dijkstra',
+            total_distance_m=geometry_m * 1.2,
+        )
+        self.assertAlmostEqual(station['distance_along_route_km'], geometry_m * 1.2 / 2000, places=6)
+
+class LoadFuelStationsCommandTests(TestCase):
+    """load_fuel_stations on a small CSV, with the geocoder mocked out"""
+
+    HEADER = 'OPIS Truckstop ID,Truckstop Name,Address,City,State,Rack ID,Retail Price\n'
+    ROWS = (
+        '1,FLYING J,I-40 EXIT 1,Amarillo,TX,100,3.199\n'
+        '2,PILOT,123 MAIN ST,Tulsa,OK,101,3.259\n'
+        '3,LOVES,456 ELM ST,Dallas,TX,not-a-rack,3.100\n'
+        '4,TA,789 OAK AVE,Austin,TX,102,3.099\n'
+    )
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.queries = []
+
+    def write_csv(self, rows):
+        path = os.path.join(self.tmpdir, 'fuel-prices.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.HEADER + rows)
+        return path
+
+    def load(self, csv_file, *args, fail_on_query=None):
+        async def fake_geocode(geolocator, query, *geocode_args, **kwargs):
+            self.queries.append(query)
+            if len(self.queries) == fail_on_query:
+                raise RuntimeError('geocoder went away')
+            return Location(query, (35.0 + len(self.queries), -97.0), {})
+
+        stdout = io.StringIO()
+        with mock.patch.object(Nominatim, 'geocode', fake_geocode):
+            call_command(
+                'load_fuel_stations', '--csv-file', csv_file, '--geocode-delay', '0',
+                *args, stdout=stdout,
+            )
+        return stdout.getvalue()
+
+    def test_malformed_row_counted_as_error(self):
+        output = self.load(self.write_csv(self.ROWS), '--skip-geocoding')
+
+        self.assertIn('Processed: 3', output)
+        self.assertIn('Created: 3', output)
+        self.assertIn('Errors: 1', output)
+        self.assertIn('Error processing row', output)
+        self.assertEqual(
+            sorted(FuelStation.objects.values_list('opis_truckstop_id', flat=True)), [1, 2, 4]
+        )
+
+    def test_rerun_updates_instead_of_duplicating(self):
+        self.load(self.write_csv(self.ROWS), '--skip-geocoding')
+        first_updated_at = FuelStation.objects.get(opis_truckstop_id=2).updated_at
+
+        output = self.load(self.write_csv(self.ROWS.replace('3.259', '3.359')), '--skip-geocoding')
+
+        self.assertIn('Created: 0', output)
+        self.assertIn('Updated: 3', output)
+        self.assertEqual(FuelStation.objects.count(), 3)
+        station = FuelStation.objects.get(opis_truckstop_id=2)
+        self.assertEqual(station.retail_price, Decimal('3.3590'))
+        self.assertGreater(station.updated_at, first_updated_at)
+
+    def test_geocode_cache_hit_skips_network(self):
+        GeocodeCache.objects.create(
+            address_key=address_key('PILOT, Tulsa, OK, USA'), latitude=36.15, longitude=-95.99
+        )
+
+        output = self.load(self.write_csv(self.ROWS))
+
+        self.assertIn('Geocoded: 3', output)
+        self.assertFalse([query for query in self.queries if 'Tulsa' in query], self.queries)
+        tulsa = FuelStation.objects.get(opis_truckstop_id=2)
+        self.assertEqual((tulsa.latitude, tulsa.longitude), (36.15, -95.99))
+        # The other two went to the geocoder once each, and their results were cached
+        self.assertEqual(len(self.queries), 2)
+        self.assertFalse(FuelStation.objects.filter(latitude__isnull=True).exists())
+        self.assertEqual(GeocodeCache.objects.count(), 3)
+
+
+    def test_interrupted_geocoding_keeps_finished_lookups(self):
+        csv_file = self.write_csv(self.ROWS)
+        self.load(csv_file, '--skip-geocoding')
+
+        with mock.patch.object(LoadFuelStationsCommand, 'GEOCODE_SAVE_EVERY', 1):
+            with self.assertRaises(RuntimeError):
+                self.load(csv_file, '--geocode-only', fail_on_query=2)
+
+        # The lookup that finished before the failure was saved, with its cache entry
+        self.assertEqual(FuelStation.objects.filter(latitude__isnull=False).count(), 1)
+        self.assertEqual(GeocodeCache.objects.count(), 1)
+
+        output = self.load(csv_file, '--geocode-only')
+
+        self.assertIn('Geocoded: 2', output)
+        self.assertEqual(len(self.queries), 4)
+        self.assertFalse(FuelStation.objects.filter(latitude__isnull=True).exists())
+
+class FastValidationTests(SimpleTestCase):
+    """validate_fast must accept exactly what the serializers accept, with the same values"""
+
+    SERIALIZERS = {
+        '/api/route/': RoutePlanSerializer,
+        '/api/route/optimize/': RouteOptimizeSerializer,
+    }
+
+    def test_valid_bodies_match_serializer(self):
+        bodies = [
+            {'start_location': ' New York, NY ', 'end_location': 'Los Angeles, CA'},
+            {'start_location': 'Houston', 'end_location': 'Dallas', 'max_distance_km': 12},
+        ]
+        for serializer_class in self.SERIALIZERS.values():
+            for body in bodies:
+                serializer = serializer_class(data=body)
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+                self.assertEqual(serializer_class.validate_fast(body), dict(serializer.validated_data))
+
+    def test_prohibited_characters_get_serializer_errors(self):
+        locations = ['\x00New York', 'New\x00York', '\ud800Austin']
+        for url, serializer_class in self.SERIALIZERS.items():
+            for location in locations:
+                body = {'start_location': location, 'end_location': 'Dallas, TX'}
+                self.assertIsNone(serializer_class.validate_fast(body), location)
+
+                serializer = serializer_class(data=body)
+                self.assertFalse(serializer.is_valid())
+                # json.dumps escapes both characters, so the body parses back to the same strings
+                response = self.client.post(url, json.dumps(body), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), serializer.errors)
+
+
+class ConditionalRouteRequestTests(TestCase):
+    """If-None-Match and If-Modified-Since handling on the route endpoints"""
+
+    URL = '/api/route/optimize/'
+    BODY = {'start_location': 'Houston, TX', 'end_location': 'Dallas, TX'}
+
+    def setUp(self):
+        cache.clear()
+        FuelStation.objects.create(
+            opis_truckstop_id=1, truckstop_name='PILOT', address='123 MAIN ST', city='Tulsa',
+            state='OK', rack_id=1, retail_price='3.2590', latitude=36.15, longitude=-95.99,
+        )
+        self.etag, self.last_modified = _route_validators(RouteOptimizeSerializer.validate_fast(self.BODY))
+
+    def post(self, **headers):
+        return self.client.post(self.URL, self.BODY, content_type='application/json', **headers)
+
+    def conditional(self, **headers):
+        request = RequestFactory().post(self.URL, **headers)
+        return _not_modified(request, self.etag)
+
+    def test_if_none_match(self):
+        response = self.post(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Last-Modified'], http_date(self.last_modified))
+
+        self.assertTrue(self.conditional(HTTP_IF_NONE_MATCH=f'"other", W/{self.etag}'))
+        self.assertFalse(self.conditional(HTTP_IF_NONE_MATCH='"other"'))
+
+    def test_if_modified_since_is_ignored(self):
+        # Last-Modified covers the station table only, so a date taken from another
+        # route's response must not turn this request into a 304
+        future = http_date(self.last_modified + 3600)
+        other_route = {'start_location': 'New York, NY', 'end_location': 'Los Angeles, CA'}
+        other_etag, other_last_modified = _route_validators(RouteOptimizeSerializer.validate_fast(other_route))
+        self.assertEqual(other_last_modified, self.last_modified)
+        self.assertNotEqual(other_etag, self.etag)
+
+        with mock.patch('fuel_route.views.GeocodingService.geocode_many', return_value=[None, None]):
+            response = self.client.post(
+                self.URL, other_route, content_type='application/json',
+                HTTP_IF_MODIFIED_SINCE=http_date(self.last_modified),
+            )
+        self.assertEqual(response.status_code, 400)
+
+        self.assertFalse(self.conditional(HTTP_IF_MODIFIED_SINCE=future))
+        self.assertFalse(self.conditional(HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=future))
+        self.assertTrue(self.conditional(HTTP_IF_NONE_MATCH=self.etag, HTTP_IF_MODIFIED_SINCE='not a date'))
+
+
+@override_settings(ROUTING_API_PROVIDER='openrouteservice')
+class RoutingServiceCacheTests(SimpleTestCase):
+    """Routes stay in the per-process LRU, and go to the Django cache only when it is shared"""
+
+    ROUTE = {'geometry': [[-95.36, 29.76], [-96.80, 32.78]], 'distance': 385000.0}
+
+    def setUp(self):
+        cache.clear()
+        RoutingService._route_cache.clear()
+        self.addCleanup(RoutingService._route_cache.clear)
+
+    def get_route(self):
+        service = RoutingService()
+        with mock.patch.object(RoutingService, '_get_route_openrouteservice', return_value=self.ROUTE) as fetch:
+            self.assertEqual(service.get_route(29.76, -95.36, 32.78, -96.80), self.ROUTE)
+            self.assertEqual(service.get_route(29.76, -95.36, 32.78, -96.80), self.ROUTE)
+        self.assertEqual(fetch.call_count, 1)
+        return cache.get('route:openrouteservice:29.76:-95.36:32.78:-96.8')
+
+    def test_local_cache_only(self):
+        with override_settings(ROUTE_SHARED_CACHE=False):
+            self.assertIsNone(self.get_route())
+
+    def test_shared_cache(self):
+        with override_settings(ROUTE_SHARED_CACHE=True):
+            self.assertEqual(self.get_route(), self.ROUTE)
+
+
+class GeocodingSuggestCacheTests(SimpleTestCase):
+    """Autocomplete suggestions are cached, but an empty answer is retried"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_suggestions_are_not_cached(self):
+        location = Location('Tulsa, OK, USA', (36.15, -95.99), {})
+        with mock.patch.object(GeocodingService, '_geocode_all', side_effect=[[None], [[location]]]) as lookup:
+            self.assertEqual(GeocodingService().suggest('Tulsa'), [])
+            expected = [{'display_name': 'Tulsa, OK, USA', 'latitude': 36.15, 'longitude': -95.99}]
+            self.assertEqual(GeocodingService().suggest('Tulsa'), expected)
+            self.assertEqual(GeocodingService().suggest('Tulsa'), expected)
+        self.assertEqual(lookup.call_count, 2)
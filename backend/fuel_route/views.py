@@ -3,19 +3,63 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
 from django.db.models import Avg
-from geopy.geocoders import Nominatim
+from django.utils.http import http_date, parse_etags, quote_etag
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 import time
+import hashlib
+import json
 import logging
-import math
+import numpy as np
 
 from .models import FuelStation
-from .services import RoutingService, FuelOptimizer
+from .services import (
+    GeocodingService, RoutingService, FuelOptimizer, MILES_PER_KM,
+    queryset_station_rows, route_bounding_box, station_row_dicts, cached_station_table_version,
+)
 from .serializers import RoutePlanSerializer, RoutePlanResponseSerializer, RouteOptimizeSerializer
 
 logger = logging.getLogger(__name__)
 
 
+def _route_validators(validated_data, *variant):
+    """
+    (ETag, Last-Modified timestamp) for a route response. The ETag covers the validated
+    request, any response options (variant) and the fuel station table version; the
+    timestamp is the latest station update, or None for an empty table.
+    """
+    version = cached_station_table_version()
+    payload = json.dumps([validated_data, variant, version], sort_keys=True, default=str)
+    etag = quote_etag(hashlib.blake2b(payload.encode(), digest_size=16).hexdigest())
+    last_modified = int(version[1].timestamp()) if version[1] else None
+    return etag, last_modified
+
+
+def _not_modified(request, etag):
+    """
+    Whether the client's copy is current: its If-None-Match lists the route's ETag.
+    If-Modified-Since is not consulted. RFC 9110 section 13.1.3 ignores it on POST, and
+    Last-Modified only tracks the station table, not the requested route.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags or f'W/{etag}' in etags
+
+
+def _include_original(request):
+    """Whether the client asked for the original_geometry alias (?include_original=1)"""
+    return request.query_params.get('include_original') == '1'
+
+
+def _cache_headers(etag, last_modified):
+    max_age = getattr(settings, 'ROUTE_RESPONSE_MAX_AGE', 300)
+    headers = {'ETag': etag, 'Cache-Control': f'private, max-age={max_age}'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
 class LocationAutocompleteView(APIView):
     """
     API endpoint for location autocomplete suggestions.
@@ -30,28 +74,11 @@ class LocationAutocompleteView(APIView):
         if not query or len(query) < 2:
             return Response([], status=status.HTTP_200_OK)
         
-        geolocator = Nominatim(user_agent="fuel_optimization_app", timeout=10)
-
         country_filter = "us"
         
         try:
-            # Use geocode with exactly_one=False to get multiple results
-            results = geolocator.geocode(
-                query,
-                exactly_one=False,
-                limit=5,
-                timeout=10,
-                country_codes=country_filter,
-            )
-            
-            suggestions = []
-            if results:
-                for location in results:
-                    suggestions.append({
-                        'display_name': location.address,
-                        'latitude': location.latitude,
-                        'longitude': location.longitude,
-                    })
+            # Repeated prefixes are served from the geocode cache
+            suggestions = GeocodingService().suggest(query, country_codes=country_filter, limit=5)
             
             return Response(suggestions, status=status.HTTP_200_OK)
             
@@ -76,11 +103,19 @@ class RoutePlanView(APIView):
     """
     
     def post(self, request):
-        serializer = RoutePlanSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        
-        initial_context, error_response = self._initial_setup(serializer.validated_data)
+        validated_data = RoutePlanSerializer.validate_fast(request.data)
+        if validated_data is None:
+            serializer = RoutePlanSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            validated_data = serializer.validated_data
+        
+        # Same request against unchanged station data gives the same plan
+        etag, last_modified = _route_validators(validated_data, _include_original(request))
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag, last_modified))
+        
+        initial_context, error_response = self._initial_setup(validated_data)
         if error_response:
             return error_response
         
@@ -99,6 +134,7 @@ class RoutePlanView(APIView):
             fuel_context['fuel_stations_list'],
             initial_context,
             route_context['total_distance_miles'],
+            route_context['total_distance_m'],
             fuel_context['fuel_stations_queryset']
         )
         
@@ -110,7 +146,7 @@ class RoutePlanView(APIView):
             optimization_results,
         )
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK, headers=_cache_headers(etag, last_modified))
 
     def _initial_setup(self, validated_data):
         start_location = validated_data['start_location']
@@ -120,12 +156,10 @@ class RoutePlanView(APIView):
         initial_fuel_gallons = validated_data.get('initial_fuel_gallons', None)
         country_filter = "us"
         
-        geolocator = Nominatim(user_agent="fuel_optimization_app", timeout=10)
-        
         try:
-            start_geo = geolocator.geocode(
-                start_location,
-                timeout=10,
+            # Cached lookups skip Nominatim; the rest run concurrently with spaced starts
+            start_geo, end_geo = GeocodingService().geocode_many(
+                [start_location, end_location],
                 country_codes=country_filter,
             )
             if not start_geo:
@@ -133,21 +167,14 @@ class RoutePlanView(APIView):
                     {'error': f'Could not geocode start location: {start_location}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            start_lat, start_lon = start_geo.latitude, start_geo.longitude
-            
-            time.sleep(1)  # Rate limiting
+            start_lat, start_lon = start_geo[:2]
             
-            end_geo = geolocator.geocode(
-                end_location,
-                timeout=10,
-                country_codes=country_filter,
-            )
             if not end_geo:
                 return None, Response(
                     {'error': f'Could not geocode end location: {end_location}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            end_lat, end_lon = end_geo.latitude, end_geo.longitude
+            end_lat, end_lon = end_geo[:2]
 
             logger.info(
                 "RoutePlanView: Geocoded locations - start: %s (%s, %s), end: %s (%s, %s)",
@@ -201,7 +228,7 @@ class RoutePlanView(APIView):
         route_geometry = route_data['geometry']
         total_distance_m = route_data['distance']
         total_distance_km = total_distance_m / 1000
-        total_distance_miles = total_distance_km / 1.60934
+        total_distance_miles = total_distance_km * MILES_PER_KM
         
         logger.info(
             "RoutePlanView: Original route has %d points, distance=%.2f km",
@@ -211,12 +238,15 @@ class RoutePlanView(APIView):
         optimize_route = getattr(settings, 'OPTIMIZE_ROUTE_GEOMETRY', True)
         optimized_geometry = route_geometry
         
+        max_points = getattr(settings, 'OPTIMIZED_ROUTE_MAX_POINTS', 300)
+        
         optimize_start_time = time.perf_counter()
-        if optimize_route and len(route_geometry) > 300:
+        # Only call into the optimizer when the route is over the point budget
+        if optimize_route and len(route_geometry) > max_points:
             logger.info("RoutePlanView: Optimizing route geometry...")
             optimized_geometry = routing_service.optimize_route_geometry(
                 route_geometry,
-                max_points=getattr(settings, 'OPTIMIZED_ROUTE_MAX_POINTS', 300)
+                max_points=max_points
             )
             optimize_elapsed = time.perf_counter() - optimize_start_time
             logger.info(
@@ -240,27 +270,15 @@ class RoutePlanView(APIView):
         }, None
 
     def _filter_fuel_stations(self, optimized_geometry, max_distance_km):
-        route_lats = [pt[1] for pt in optimized_geometry]
-        route_lons = [pt[0] for pt in optimized_geometry]
-        min_lat, max_lat = min(route_lats), max(route_lats)
-        min_lon, max_lon = min(route_lons), max(route_lons)
-        
-        avg_lat = (min_lat + max_lat) / 2
-        lat_deg_threshold = max_distance_km / 111.0
-        lon_deg_threshold = max_distance_km / (111.0 * math.cos(math.radians(avg_lat)))
+        min_lat, max_lat, min_lon, max_lon = route_bounding_box(optimized_geometry, max_distance_km)
         
         fuel_stations = FuelStation.objects.filter(
             latitude__isnull=False,
             longitude__isnull=False,
-            latitude__gte=min_lat - lat_deg_threshold,
-            latitude__lte=max_lat + lat_deg_threshold,
-            longitude__gte=min_lon - lon_deg_threshold,
-            longitude__lte=max_lon + lon_deg_threshold
-        )
-        
-        logger.info(
-            "RoutePlanView: Pre-filtered to %d stations in bounding box (within ~%.1f km)",
-            fuel_stations.count(), max_distance_km
+            latitude__gte=min_lat,
+            latitude__lte=max_lat,
+            longitude__gte=min_lon,
+            longitude__lte=max_lon,
         )
         
         optimizer = FuelOptimizer(
@@ -271,45 +289,40 @@ class RoutePlanView(APIView):
         filter_start_time = time.perf_counter()
         nearby_station_ids = set()
         station_distance_info = {}
-        stations_processed = 0
-        
-        for station in fuel_stations:
-            stations_processed += 1
-            if stations_processed % 100 == 0:
-                logger.info(
-                    "RoutePlanView: Processed %d/%d stations...",
-                    stations_processed, fuel_stations.count()
-                )
-            
-            station_dict = {
-                'id': station.id,
-                'name': station.truckstop_name,
-                'address': f"{station.address}, {station.city}, {station.state}",
-                'lat': float(station.latitude),
-                'lon': float(station.longitude),
-                'price': float(station.retail_price),
+        fuel_stations_list = []
+        
+        # One query for the candidates as plain row tuples; their count comes from the list,
+        # not a COUNT(*)
+        candidate_rows = queryset_station_rows(fuel_stations)
+        stations_processed = len(candidate_rows)
+        logger.info(
+            "RoutePlanView: Pre-filtered to %d stations in bounding box (within ~%.1f km)",
+            stations_processed, max_distance_km
+        )
+        
+        # Distances from every candidate to the route in one vectorized pass; only the matches
+        # become station dicts (with distance fields added), which are the optimizer's input
+        for result in optimizer.batch_filter_station_rows(
+            candidate_rows,
+            optimized_geometry,
+            max_distance_km=max_distance_km
+        ):
+            fuel_stations_list.append(result)
+            nearby_station_ids.add(result['id'])
+            station_distance_info[result['id']] = {
+                'distance_along_route_km': result['distance_along_route_km'],
+                'distance_from_route_km': result['distance_from_route_km'],
             }
-            
-            result = optimizer.process_station_with_threshold(
-                station_dict,
-                optimized_geometry,
-                max_distance_km=max_distance_km
-            )
-            
-            if result:
-                nearby_station_ids.add(station.id)
-                station_distance_info[station.id] = {
-                    'distance_along_route_km': result.get('distance_along_route_km', 0),
-                    'distance_from_route_km': result.get('distance_from_route_km', 0),
-                }
         
         if nearby_station_ids:
+            # Lazy: only queried if the average-price fallback needs it
             fuel_stations = fuel_stations.filter(id__in=nearby_station_ids)
         else:
             logger.info(
                 "RoutePlanView: No stations found within %.1f km of route",
                 max_distance_km
             )
+            fuel_stations_list = station_row_dicts(candidate_rows)
         
         filter_elapsed = time.perf_counter() - filter_start_time
         logger.info(
@@ -319,24 +332,9 @@ class RoutePlanView(APIView):
         
         logger.info(
             "RoutePlanView: Found %d fuel stations within %.1f km of route",
-            fuel_stations.count(), max_distance_km
+            len(nearby_station_ids), max_distance_km
         )
         
-        fuel_stations_list = []
-        for station in fuel_stations:
-            station_dict = {
-                'id': station.id,
-                'name': station.truckstop_name,
-                'address': f"{station.address}, {station.city}, {station.state}",
-                'lat': float(station.latitude),
-                'lon': float(station.longitude),
-                'price': float(station.retail_price),
-            }
-            if station.id in station_distance_info:
-                station_dict['distance_along_route_km'] = station_distance_info[station.id]['distance_along_route_km']
-                station_dict['distance_from_route_km'] = station_distance_info[station.id]['distance_from_route_km']
-            fuel_stations_list.append(station_dict)
-        
         return {
             'fuel_stations_queryset': fuel_stations,
             'station_distance_info': station_distance_info,
@@ -351,6 +349,7 @@ class RoutePlanView(APIView):
         fuel_stations_list,
         context,
         total_distance_miles,
+        total_distance_m,
         fuel_stations_queryset,
     ):
         start_lat = context['start_lat']
@@ -370,12 +369,13 @@ class RoutePlanView(APIView):
             end_lon=end_lon,
             initial_fuel_gallons=initial_fuel_gallons,
             algorithm=algorithm,
+            total_distance_m=total_distance_m,
         )
         optimal_stops_elapsed = time.perf_counter() - optimal_stops_start_time
         logger.info(
             "[TIMING] RoutePlanView: FuelOptimizer.find_optimal_stops took %.3f seconds (stations_count=%d)",
             optimal_stops_elapsed,
-            fuel_stations_queryset.count(),
+            len(fuel_stations_list),
         )
         
         total_fuel_cost = 0
@@ -444,15 +444,34 @@ class RoutePlanView(APIView):
         total_distance_miles = route_context['total_distance_miles']
         total_distance_m = route_context['total_distance_m']
         
-        request.session['start_location'] = start_location
-        request.session['end_location'] = end_location
-        request.session['start_coords'] = {'latitude': start_lat, 'longitude': start_lon}
-        request.session['end_coords'] = {'latitude': end_lat, 'longitude': end_lon}
+        fuel_stops = []
+        for stop in optimal_stops:
+            # Resolve each distance once; the optimizer's value wins over the filter pass
+            info = station_distance_info.get(stop.get('id'), {})
+            along_km = stop.get('distance_along_route_km') or info.get('distance_along_route_km', 0)
+            from_km = stop.get('distance_from_route_km') or info.get('distance_from_route_km', 0)
+            fuel_stops.append({
+                'id': stop.get('id'),
+                'name': stop['name'],
+                'address': stop['address'],
+                'location': {
+                    'latitude': stop['lat'],
+                    'longitude': stop['lon'],
+                },
+                'price_per_gallon': round(stop['price'], 4),
+                'distance_along_route_km': round(along_km, 2),
+                'distance_along_route_miles': round(along_km * MILES_PER_KM, 2),
+                'distance_from_route_km': round(from_km, 2),
+                'distance_from_route_miles': round(from_km * MILES_PER_KM, 2),
+                'is_selected': True,
+                'fuel_capacity_at_arrival': stop.get('fuel_capacity_at_arrival', 0),
+                'fuel_purchased_gallons': stop.get('fuel_purchased_gallons', 0),
+                'fuel_cost_at_stop': stop.get('fuel_cost_at_stop', 0),
+            })
         
         response_data = {
             'route': {
                 'geometry': route_geometry,
-                'original_geometry': route_geometry,
                 'optimized_geometry': optimized_geometry,
                 'total_distance_km': round(total_distance_km, 2),
                 'total_distance_miles': round(total_distance_miles, 2),
@@ -460,47 +479,7 @@ class RoutePlanView(APIView):
                 'original_points_count': len(route_geometry),
                 'optimized_points_count': len(optimized_geometry),
             },
-            'fuel_stops': [
-                {
-                    'id': stop.get('id'),
-                    'name': stop['name'],
-                    'address': stop['address'],
-                    'location': {
-                        'latitude': stop['lat'],
-                        'longitude': stop['lon'],
-                    },
-                    'price_per_gallon': round(stop['price'], 4),
-                    'distance_along_route_km': round(
-                        stop.get('distance_along_route_km')
-                        or station_distance_info.get(stop.get('id'), {}).get('distance_along_route_km', 0),
-                        2,
-                    ),
-                    'distance_along_route_miles': round(
-                        (
-                            stop.get('distance_along_route_km')
-                            or station_distance_info.get(stop.get('id'), {}).get('distance_along_route_km', 0)
-                        ) / 1.60934,
-                        2,
-                    ),
-                    'distance_from_route_km': round(
-                        stop.get('distance_from_route_km')
-                        or station_distance_info.get(stop.get('id'), {}).get('distance_from_route_km', 0),
-                        2,
-                    ),
-                    'distance_from_route_miles': round(
-                        (
-                            stop.get('distance_from_route_km')
-                            or station_distance_info.get(stop.get('id'), {}).get('distance_from_route_km', 0)
-                        ) / 1.60934,
-                        2,
-                    ),
-                    'is_selected': True,
-                    'fuel_capacity_at_arrival': stop.get('fuel_capacity_at_arrival', 0),
-                    'fuel_purchased_gallons': stop.get('fuel_purchased_gallons', 0),
-                    'fuel_cost_at_stop': stop.get('fuel_cost_at_stop', 0),
-                }
-                for stop in optimal_stops
-            ],
+            'fuel_stops': fuel_stops,
             'fuel_stops_count': len(optimal_stops),
             'max_distance_km': max_distance_km,
             'total_fuel_cost': round(total_fuel_cost, 2),
@@ -512,6 +491,9 @@ class RoutePlanView(APIView):
             'algorithm': algorithm,
             'initial_fuel_gallons': initial_fuel_gallons,
         }
+        # 'geometry' already is the full route; repeating it doubles the largest field
+        if _include_original(request):
+            response_data['route']['original_geometry'] = route_geometry
         
         return response_data
 
@@ -529,35 +511,38 @@ class RouteOptimizeView(APIView):
     """
     
     def post(self, request):
-        serializer = RouteOptimizeSerializer(data=request.data)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        validated_data = RouteOptimizeSerializer.validate_fast(request.data)
+        if validated_data is None:
+            serializer = RouteOptimizeSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            validated_data = serializer.validated_data
+        
+        # Same request against unchanged station data gives the same stations
+        etag, last_modified = _route_validators(validated_data)
+        if _not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=_cache_headers(etag, last_modified))
         
-        start_location = serializer.validated_data['start_location']
-        end_location = serializer.validated_data['end_location']
-        max_distance_km = serializer.validated_data.get('max_distance_km', 5.0)
-        
-        # Geocode locations
-        geolocator = Nominatim(user_agent="fuel_optimization_app", timeout=10)
+        start_location = validated_data['start_location']
+        end_location = validated_data['end_location']
+        max_distance_km = validated_data.get('max_distance_km', 5.0)
         
+        # Geocode locations (concurrently; the service spaces their starts for rate limiting)
         try:
-            start_geo = geolocator.geocode(start_location, timeout=10)
+            start_geo, end_geo = GeocodingService().geocode_many([start_location, end_location])
             if not start_geo:
                 return Response(
                     {'error': f'Could not geocode start location: {start_location}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            start_lat, start_lon = start_geo.latitude, start_geo.longitude
+            start_lat, start_lon = start_geo[:2]
             
-            time.sleep(1)  # Rate limiting
-            
-            end_geo = geolocator.geocode(end_location, timeout=10)
             if not end_geo:
                 return Response(
                     {'error': f'Could not geocode end location: {end_location}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            end_lat, end_lon = end_geo.latitude, end_geo.longitude
+            end_lat, end_lon = end_geo[:2]
 
             logger.info("RouteOptimizeView: Geocoded locations - start: %s (%s, %s), end: %s (%s, %s)", 
                        start_location, start_lat, start_lon, end_location, end_lat, end_lon)
@@ -587,7 +572,7 @@ class RouteOptimizeView(APIView):
         route_geometry = route_data['geometry']
         total_distance_m = route_data['distance']
         total_distance_km = total_distance_m / 1000
-        total_distance_miles = total_distance_km / 1.60934
+        total_distance_miles = total_distance_km * MILES_PER_KM
         
         logger.info("RouteOptimizeView: Original route has %d points, distance=%.2f km", 
                    len(route_geometry), total_distance_km)
@@ -596,12 +581,15 @@ class RouteOptimizeView(APIView):
         optimize_route = getattr(settings, 'OPTIMIZE_ROUTE_GEOMETRY', True)
         optimized_geometry = route_geometry
         
+        max_points = getattr(settings, 'OPTIMIZED_ROUTE_MAX_POINTS', 300)
+        
         optimize_start_time = time.perf_counter()
-        if optimize_route and len(route_geometry) > 300:
+        # Only call into the optimizer when the route is over the point budget
+        if optimize_route and len(route_geometry) > max_points:
             logger.info("RouteOptimizeView: Optimizing route geometry...")
             optimized_geometry = routing_service.optimize_route_geometry(
                 route_geometry,
-                max_points=getattr(settings, 'OPTIMIZED_ROUTE_MAX_POINTS', 300)
+                max_points=max_points
             )
             optimize_elapsed = time.perf_counter() - optimize_start_time
             logger.info("[TIMING] RouteOptimizeView: Optimizing route took %.3f seconds (reduced from %d to %d points)", 
@@ -612,74 +600,62 @@ class RouteOptimizeView(APIView):
                        optimize_elapsed, len(route_geometry))
         
         # Pre-filter stations using bounding box to reduce processing
-        # Calculate route bounding box
-        route_lats = [pt[1] for pt in optimized_geometry]
-        route_lons = [pt[0] for pt in optimized_geometry]
-        min_lat, max_lat = min(route_lats), max(route_lats)
-        min_lon, max_lon = min(route_lons), max(route_lons)
-        
-        # Expand bounding box by max_distance_km (rough approximation in degrees)
-        # ~111 km per degree latitude, ~111*cos(lat) km per degree longitude
-        avg_lat = (min_lat + max_lat) / 2
-        lat_deg_threshold = max_distance_km / 111.0
-        lon_deg_threshold = max_distance_km / (111.0 * math.cos(math.radians(avg_lat)))
+        # Route bounding box expanded by max_distance_km (rough approximation in degrees)
+        min_lat, max_lat, min_lon, max_lon = route_bounding_box(optimized_geometry, max_distance_km)
         
         # Database-level bounding box filter (much faster than processing all stations)
         fuel_stations = FuelStation.objects.filter(
             latitude__isnull=False,
             longitude__isnull=False,
-            latitude__gte=min_lat - lat_deg_threshold,
-            latitude__lte=max_lat + lat_deg_threshold,
-            longitude__gte=min_lon - lon_deg_threshold,
-            longitude__lte=max_lon + lon_deg_threshold
+            latitude__gte=min_lat,
+            latitude__lte=max_lat,
+            longitude__gte=min_lon,
+            longitude__lte=max_lon,
         )
         
-        logger.info("RouteOptimizeView: Pre-filtered to %d stations in bounding box (within ~%.1f km)", 
-                   fuel_stations.count(), max_distance_km)
-        
         # Use FuelOptimizer to find stations near the route
         optimizer = FuelOptimizer()
         
         # Time measurement for filtering nearby fuel stops
         filter_start_time = time.perf_counter()
         
-        # Find stations near the route
-        nearby_stations = []
-        stations_processed = 0
+        # Find stations near the route (one query; the count comes from the list)
+        candidate_rows = queryset_station_rows(fuel_stations)
+        stations_processed = len(candidate_rows)
+        logger.info("RouteOptimizeView: Pre-filtered to %d stations in bounding box (within ~%.1f km)", 
+                   stations_processed, max_distance_km)
         
-        for station in fuel_stations:
-            stations_processed += 1
-            if stations_processed % 100 == 0:
-                logger.info("RouteOptimizeView: Processed %d/%d stations...", 
-                           stations_processed, fuel_stations.count())
-            
-            station_dict = {
-                'id': station.id,
-                'name': station.truckstop_name,
-                'address': f"{station.address}, {station.city}, {station.state}",
-                'lat': float(station.latitude),
-                'lon': float(station.longitude),
-                'price': float(station.retail_price),
+        # Distances from every candidate to the route (within the configurable threshold)
+        # in one vectorized pass
+        results = optimizer.batch_filter_station_rows(
+            candidate_rows, optimized_geometry, max_distance_km=max_distance_km
+        )
+        
+        # Round every numeric column at once instead of per station
+        along_km = np.array([r['distance_along_route_km'] for r in results], dtype=float)
+        from_km = np.array([r['distance_from_route_km'] for r in results], dtype=float)
+        prices = np.round([r['price'] for r in results], 4).tolist()
+        rounded = np.round(
+            np.stack([along_km, along_km * MILES_PER_KM, from_km, from_km * MILES_PER_KM]), 2
+        ).tolist()
+        
+        nearby_stations = [
+            {
+                'id': result['id'],
+                'name': result['name'],
+                'address': result['address'],
+                'location': {
+                    'latitude': result['lat'],
+                    'longitude': result['lon'],
+                },
+                'price_per_gallon': price,
+                'distance_along_route_km': along,
+                'distance_along_route_miles': along_mi,
+                'distance_from_route_km': off,
+                'distance_from_route_miles': off_mi,
             }
-            
-            # Process station to find distance from route with configurable threshold
-            result = optimizer.process_station_with_threshold(station_dict, optimized_geometry, max_distance_km=max_distance_km)
-            
-            if result:
-                nearby_stations.append({
-                    'id': result['id'],
-                    'name': result['name'],
-                    'address': result['address'],
-                    'location': {
-                        'latitude': result['lat'],
-                        'longitude': result['lon'],
-                    },
-                    'price_per_gallon': round(result['price'], 4),
-                    'distance_along_route_km': round(result['distance_along_route_km'], 2),
-                    'distance_along_route_miles': round(result['distance_along_route_km'] / 1.60934, 2),
-                    'distance_from_route_km': round(result['distance_from_route_km'], 2),
-                    'distance_from_route_miles': round(result['distance_from_route_km'] / 1.60934, 2),
-                })
+            for result, price, along, along_mi, off, off_mi in zip(results, prices, *rounded)
+        ]
         
         # Sort by distance along route
         nearby_stations.sort(key=lambda x: x['distance_along_route_km'])
@@ -717,4 +693,4 @@ class RouteOptimizeView(APIView):
             },
         }
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_200_OK, headers=_cache_headers(etag, last_modified))